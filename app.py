@@ -5,19 +5,24 @@ Ask questions about any GitHub repository using AI-powered semantic search
 
 import streamlit as st
 import os
+import json
+import hashlib
+import uuid
 from dotenv import load_dotenv
 import time
-from typing import List, Dict
+import re
+from pathlib import Path
+from string import Template
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, TYPE_CHECKING
 import logging
 
-# Import our services
-from services.github_loader import GitHubLoader
-from services.document_processor import process_documents
-from services.embeddings import get_embeddings_model
-from services.retrieval import retrieve_context, format_context_for_llm, get_citations
-from langchain_community.vectorstores import Chroma
-from langchain_groq import ChatGroq
-from langchain_core.documents import Document
+# Heavy imports (LangChain, Chroma, Groq, our services) are deferred to the
+# functions that use them: Streamlit reruns this script on every interaction,
+# and the welcome screen shouldn't pay for any of them.
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
 
 # Load environment variables
 load_dotenv()
@@ -26,6 +31,175 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Questions that ask for the file listing instead of a RAG answer
+FILE_QUESTION_RE = re.compile(
+    r"\b(?:what files|list files|show files|files in|repo(?:sitory)? structure|what is in)\b",
+    re.IGNORECASE
+)
+
+# Retrieval starts narrow; the LLM can ask for a wider pass by answering
+# with the sentinel alone (see expand_on_sentinel)
+INITIAL_K = 3
+EXPANDED_K = 5
+NEED_MORE_CONTEXT = "<NEED_MORE_CONTEXT>"
+NO_CONTEXT_ANSWER = "I couldn't find any relevant information in the repository to answer your question."
+
+# Prompts put the static instructions first and the per-turn context/question
+# last, so the instruction prefix is byte-identical across turns and can be
+# served from the LLM provider's prefix (KV) cache. Keep anything dynamic out
+# of the instruction block.
+
+# RAG answer prompt used by generate_answer (built once, filled per query)
+ANSWER_PROMPT = Template("""You are a senior software engineer assistant. Answer the user's question about the repository.
+
+INSTRUCTIONS:
+1. Be **precise** and avoid fluff.
+2. Use **Markdown structure** (headers, bullet points).
+3. Start with a direct answer.
+4. If showing code, use syntax highlighting.
+5. Reference specific files/functions.
+6. If the context below is not enough to answer, reply with exactly <NEED_MORE_CONTEXT> and nothing else.
+
+FORMAT:
+### Summary
+[Brief summary of the answer]
+
+### Key Details
+- [Bullet point 1]
+- [Bullet point 2]
+- [Bullet point 3]
+
+### Code Reference (if applicable)
+```[language]
+[code snippet]
+```
+
+### 🛠️ Command Breakdown (if applicable)
+- `[command]`: [What this command does and why it is used]
+
+CONTEXT FROM REPOSITORY:
+$context
+
+USER QUESTION: $query
+""")
+
+# Prompt for the streamed chat answer in render_chat_interface
+CHAT_PROMPT = Template("""You are a senior technical writer and software engineer.
+
+STRICT OUTPUT FORMAT (Markdown):
+
+### 🎯 Summary
+[Direct, 1-sentence answer]
+
+### 🔍 Key Details
+- [Bullet point 1]
+- [Bullet point 2]
+- [Bullet point 3]
+
+### 💻 Code Reference
+(Only if relevant, otherwise omit this section)
+```[language]
+[code snippet]
+```
+
+### 🛠️ Command Breakdown
+(If you suggested terminal commands like pip, git, or python, explain exactly what each flag/part does here)
+- `[command part]`: [Explanation]
+
+### 🔗 Source Files
+(List the filenames used)
+
+If the context below is not enough to answer, reply with exactly <NEED_MORE_CONTEXT> and nothing else.
+
+### Context
+$context
+
+### Question
+$question
+""")
+
+# App stylesheet (read and minified once, see load_css)
+CSS_PATH = str(Path(__file__).parent / "assets" / "app.css")
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_WHITESPACE_RE = re.compile(r'\s+')
+
+# Protocol, GitHub domain and characters invalid in Windows directory names
+REPO_DIR_UNSAFE_RE = re.compile(r'https?://|github\.com/|[<>:"/\\|?*]')
+UNDERSCORE_RUN_RE = re.compile(r'_+')
+
+# ============================================================================
+# UI CONTENT - Static text/HTML used by the render functions
+# ============================================================================
+
+# Curated popular repositories for the Quick-Start cards
+EXAMPLE_REPOS = (
+    {"repo": "langchain-ai/langchain", "name": "LangChain", "icon": "🦜"},
+    {"repo": "facebook/react", "name": "React", "icon": "⚛️"},
+    {"repo": "fastapi/fastapi", "name": "FastAPI", "icon": "🚀"},
+    {"repo": "srinath2934/execflow-ai", "name": "ExecFlow", "icon": "⚙️"},
+)
+
+HEADER_HTML = """
+<div class="header">
+    <h1>🤖 RepoChat</h1>
+    <p>Instant AI answers for any GitHub repository</p>
+</div>
+"""
+
+# Only {repo} is filled in per render
+CHAT_HEADER_HTML = """
+<div style="padding: 1rem 0; text-align: center; border-bottom: 1px solid #e8e3dc; margin-bottom: 1rem;">
+    <span style="font-size: 1.2rem; font-weight: 600; color: #2d2d2d;">🤖 RepoChat</span>
+    <span style="color: #d4cfc4; margin: 0 0.5rem;">|</span>
+    <span style="color: #6b6b6b;">{repo}</span>
+</div>
+"""
+
+NO_REPO_BADGE_HTML = '<div class="status-badge status-warning">⚠️ No Repository Loaded</div>'
+
+FEATURES_MD = """
+🔍 Smart code search  
+🤖 AI-powered answers  
+📚 Source citations  
+⚡ Fast & accurate
+"""
+
+WELCOME_MD = """
+##  Welcome to RepoChat!
+
+**Get started in 3 easy steps:**
+
+1. 📦 **Load a repository** from the sidebar
+2. ✍️ **Ask questions** about the code
+3. 📚 **Get AI-powered answers** with source citations
+"""
+
+# One Markdown block per column
+EXAMPLE_QUESTIONS_MD = (
+    """
+**General Questions:**
+- What does this repository do?
+- How is the project structured?
+- What are the main features?
+
+**Technical Questions:**
+- How does authentication work?
+- Show me the API endpoints
+- Where is error handling implemented?
+""",
+    """
+**Code Questions:**
+- What is the main entry point?
+- How is data validated?
+- Show me the database schema
+
+**Deep Dive:**
+- Explain the login function
+- How does caching work?
+- What dependencies are used?
+""",
+)
+
 # ============================================================================
 # PAGE CONFIG - Must be first Streamlit command
 # ============================================================================
@@ -41,105 +215,30 @@ st.set_page_config(
 # CUSTOM CSS - Modern, Premium Design
 # ============================================================================
 
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Charter:wght@400;500;600;700&family=Source+Sans+Pro:wght@400;600&display=swap');
-    
-    /* 
-       GLOBAL COLOR OVERRIDE 
-       Forces dark text regardless of system dark/light mode for our light beige theme 
-    */
-    .stApp, .stMarkdown, p, h1, h2, h3, h4, h5, h6, li, span, label, div {
-        color: #2d2d2d !important;
-    }
-
-    * {
-        font-family: 'Source Sans Pro', -apple-system, BlinkMacSystemFont, sans-serif;
-    }
-    
-    .main {
-        background: #f7f5f2;
-        padding: 2rem;
-    }
-    
-    .stApp {
-        background: #f7f5f2;
-    }
-    
-    .header {
-        background: #ffffff;
-        color: #2d2d2d;
-        padding: 2.5rem 2rem;
-        border-radius: 12px;
-        text-align: center;
-        margin-bottom: 2rem;
-        border: 1px solid #e8e3dc;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.03);
-    }
-    
-    /* Sidebar glassmorphism-ish style */
-    [data-testid="stSidebar"] {
-        background: #ebe8e3;
-        border-right: 1px solid #d4cfc4;
-    }
-    
-    /* Quick Select Cards */
-    .repo-card {
-        background: #ffffff;
-        border: 1px solid #d4cfc4;
-        border-radius: 10px;
-        padding: 1rem;
-        margin-bottom: 0.75rem;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        cursor: pointer;
-        display: flex;
-        align-items: center;
-        gap: 12px;
-    }
-    
-    .repo-card:hover {
-        border-color: #9a8f7f;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.08);
-        transform: translateY(-2px);
-    }
-
-    /* Primary and Accent Buttons */
-    .stButton > button {
-        background: #ffffff !important;
-        color: #2d2d2d !important;
-        border: 1px solid #d4cfc4 !important;
-        border-radius: 8px;
-        padding: 0.625rem 1.5rem;
-        font-weight: 600;
-        transition: all 0.2s ease;
-    }
-    
-    .stButton > button:hover {
-        background: #f7f5f2 !important;
-        border-color: #9a8f7f !important;
-        box-shadow: 0 2px 6px rgba(0,0,0,0.12);
-    }
-    
-    /* Status feedback */
-    .status-badge {
-        display: inline-block;
-        padding: 0.4rem 0.875rem;
-        border-radius: 16px;
-        font-size: 0.875rem;
-        font-weight: 600;
-        margin: 0.25rem;
-    }
-    
-    .status-warning { background: #fff3e0; color: #e65100; border: 1px solid #ffe0b2; }
-    .status-success { background: #e8f5e9; color: #2e7d32; border: 1px solid #c8e6c9; }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_data(show_spinner=False)
+def load_css(path: str = CSS_PATH) -> str:
+    """Read the stylesheet once per process, minus comments and indentation"""
+    css = Path(path).read_text(encoding="utf-8")
+    css = CSS_COMMENT_RE.sub("", css)
+    return CSS_WHITESPACE_RE.sub(" ", css).strip()
+
+st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
 
 # ============================================================================
 # SESSION STATE INITIALIZATION
 # ============================================================================
 
+# Chat history is a sliding window: only the last MAX_TURNS exchanges
+# (user + assistant) are kept, so reruns and prompts stay O(MAX_TURNS).
+# Older messages are appended to a per-session JSONL log and read back on
+# demand; the log is deleted when the chat is cleared or the repo changes.
+MAX_TURNS = 8
+CHAT_LOG_DIR = "./chat_history"
+
+# Seconds a loaded repo is served from memory before the head commit is
+# checked again
+REPO_CACHE_TTL = 3600
+
 def init_session_state():
     """Initialize all session state variables"""
     if 'messages' not in st.session_state:
@@ -162,6 +261,104 @@ def init_session_state():
     
     if 'document_count' not in st.session_state:
         st.session_state.document_count = 0
+    
+    if 'file_set' not in st.session_state:
+        st.session_state.file_set = None
+    
+    if 'embedding_matrix' not in st.session_state:
+        st.session_state.embedding_matrix = None
+    
+    if 'older_count' not in st.session_state:
+        st.session_state.older_count = 0
+    
+    if 'chat_session_id' not in st.session_state:
+        st.session_state.chat_session_id = uuid.uuid4().hex
+
+def chat_log_path() -> str:
+    """This session's file holding messages that left the sliding window"""
+    return os.path.join(CHAT_LOG_DIR, f"{st.session_state.chat_session_id}.jsonl")
+
+def clear_chat_log():
+    """Delete this session's chat log (Clear Chat, Reset All, repo switch)"""
+    try:
+        os.remove(chat_log_path())
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"⚠️ Could not delete chat log: {e}")
+
+def trim_chat_history():
+    """Move messages that fall outside the sliding window to the chat log"""
+    overflow = len(st.session_state.messages) - MAX_TURNS * 2
+    if overflow <= 0:
+        return
+    
+    spilled = st.session_state.messages[:overflow]
+    st.session_state.messages = st.session_state.messages[overflow:]
+    try:
+        os.makedirs(CHAT_LOG_DIR, exist_ok=True)
+        with open(chat_log_path(), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(message) + "\n" for message in spilled)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write chat log: {e}")
+
+def load_older_messages(count: int) -> List[Dict]:
+    """Last `count` messages from the chat log (the ones just before the window)"""
+    try:
+        with open(chat_log_path(), encoding="utf-8") as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+    return [json.loads(line) for line in lines[-count:]]
+
+def expand_on_sentinel(stream, more_context=None):
+    """
+    Yield the text of an LLM stream, unless it opens with NEED_MORE_CONTEXT.
+    
+    Only the first few characters are held back while they could still be
+    the sentinel. If it is, the stream is dropped and the one returned by
+    more_context() (a retry with wider retrieval) is used instead, once.
+    """
+    stream = iter(stream)
+    head = ""
+    for chunk in stream:
+        head += getattr(chunk, "content", chunk)
+        opening = head.lstrip()
+        if len(opening) >= len(NEED_MORE_CONTEXT) or not NEED_MORE_CONTEXT.startswith(opening):
+            break
+    
+    if head.lstrip().startswith(NEED_MORE_CONTEXT):
+        if more_context is None:
+            yield NO_CONTEXT_ANSWER
+        else:
+            logger.info("🔁 LLM asked for more context, widening retrieval")
+            yield from expand_on_sentinel(more_context())
+        return
+    
+    if head:
+        yield head
+    for chunk in stream:
+        yield getattr(chunk, "content", chunk)
+
+def coalesce_stream(stream, max_delay: float = 0.1, min_chars: int = 80):
+    """
+    Merge LLM stream chunks into fewer, larger pieces for st.write_stream.
+    
+    Each yielded piece re-renders the whole growing Markdown message, so
+    flush every ~100ms or ~80 chars (~20 tokens), whichever comes first,
+    instead of once per token.
+    """
+    buffer = ""
+    last_flush = time.monotonic()
+    for chunk in stream:
+        buffer += getattr(chunk, "content", chunk)
+        now = time.monotonic()
+        if len(buffer) >= min_chars or now - last_flush >= max_delay:
+            yield buffer
+            buffer = ""
+            last_flush = now
+    if buffer:
+        yield buffer
 
 # ============================================================================
 # BACKEND FUNCTIONS
@@ -171,6 +368,9 @@ def init_session_state():
 def initialize_llm():
     """Initialize the Groq LLM"""
     try:
+        from langchain_groq import ChatGroq
+        from services.llm import groq_client_kwargs
+        
         groq_api_key = os.getenv("GROQ_API_KEY")
         if not groq_api_key:
             st.error("❌ GROQ_API_KEY not found in .env file")
@@ -180,7 +380,8 @@ def initialize_llm():
             groq_api_key=groq_api_key,
             model_name="llama-3.3-70b-versatile",  # Updated to working model
             temperature=0.3,
-            max_tokens=2048
+            max_tokens=2048,
+            **groq_client_kwargs()
         )
         
         logger.info("✅ Groq LLM initialized")
@@ -189,23 +390,80 @@ def initialize_llm():
         st.error(f"❌ Failed to initialize LLM: {e}")
         return None
 
+@st.cache_resource
+def start_embeddings_warmup():
+    """
+    Start loading the embeddings model in the background, once per process.
+    
+    Called on app start so the weights load while the user is still picking
+    a repository, without delaying the first paint.
+    """
+    from services.embeddings import get_embeddings_model
+    
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(get_embeddings_model)
+    executor.shutdown(wait=False)
+    return future
+
 @st.cache_resource
 def initialize_embeddings():
     """Initialize embeddings model"""
+    from services.embeddings import get_embeddings_model
+    from services.retrieval import warmup_scoring
+    
     try:
         embeddings = get_embeddings_model()
+        warmup_scoring()
         logger.info("✅ Embeddings model initialized")
         return embeddings
     except Exception as e:
         st.error(f"❌ Failed to initialize embeddings: {e}")
         return None
 
-def load_github_repo(repo_url: str, branch: str = "main") -> tuple:
-    """Load and process GitHub repository"""
+@st.cache_resource
+def loaded_repos() -> dict:
+    """
+    Process-wide registry of loaded repositories, shared by all sessions.
+    
+    (repo_url, branch) -> (loaded_at, vectorstore, doc_count, file_set, embedding_matrix)
+    """
+    return {}
+
+def remember_repo(key: tuple, vectorstore: "Chroma", doc_count: int):
+    """Record a successful load (with this session's file set / matrix)"""
+    loaded_repos()[key] = (
+        time.time(), vectorstore, doc_count,
+        st.session_state.file_set, st.session_state.embedding_matrix
+    )
+
+def load_github_repo(repo_url: str, branch: str = "main", force_reindex: bool = False) -> tuple:
+    """Load and process GitHub repository (reuses an existing index unless force_reindex)"""
+    from services.github_loader import GitHubLoader
+    from services.document_processor import process_documents
+    from services.vector_store import (
+        add_documents_in_batches, create_vector_store, collection_name_for,
+        completed_index_count, discard_index, drop_stale_collections,
+        mark_index_complete
+    )
+    from services.retrieval import EmbeddingMatrix
+    
     try:
+        # Loaded recently (by any session)? Skip even the commit check
+        key = (repo_url, branch)
+        cached = loaded_repos().get(key)
+        if cached and not force_reindex and time.time() - cached[0] < REPO_CACHE_TTL:
+            _, vectorstore, doc_count, file_set, embedding_matrix = cached
+            st.session_state.file_set = file_set
+            st.session_state.embedding_matrix = embedding_matrix
+            return vectorstore, doc_count, None
+        
         # Step 1: Load repository
         with st.status("🔄 Loading GitHub repository...", expanded=True) as status:
-            st.write("📦 Connecting to GitHub...")
+            # Sanitize repo_url to create a valid Windows directory name:
+            # drop protocol/domain, replace < > : " / \ | ? * with underscores,
+            # collapse runs of underscores and trim them from the ends
+            safe_name = REPO_DIR_UNSAFE_RE.sub('_', repo_url)
+            safe_name = UNDERSCORE_RUN_RE.sub('_', safe_name).strip('_')
             
             loader = GitHubLoader(
                 repo=repo_url,
@@ -214,6 +472,51 @@ def load_github_repo(repo_url: str, branch: str = "main") -> tuple:
                 commit_history_limit=30
             )
             
+            # The index is keyed by the branch head commit: the same commit is
+            # reused from disk, a new one is re-indexed automatically
+            st.write("🔎 Checking latest commit...")
+            commit = loader.head_commit()
+            if not commit:
+                logger.warning("⚠️ Head commit unknown, using the repo's unversioned index")
+            
+            persist_directory = f"./chroma_db_{safe_name}"
+            collection_name = collection_name_for(safe_name, commit)
+            
+            # The embedding model has been loading in the background since app
+            # start - it only has to be ready once the download + chunking are done
+            model_future = start_embeddings_warmup()
+            
+            def wait_for_embeddings():
+                try:
+                    model_future.result()
+                except Exception as e:
+                    logger.warning(f"Background embeddings load failed: {e}")
+                # Instant once the background load succeeded; reports errors otherwise
+                st.session_state.embeddings = initialize_embeddings()
+                return st.session_state.embeddings
+            
+            # Already indexed (and ingestion finished)? Skip download, chunking
+            # and embedding entirely (embedded by default; set CHROMA_HOST to
+            # use a Chroma server)
+            existing = completed_index_count(persist_directory, collection_name)
+            if existing and not force_reindex:
+                st.write(f"♻️ Reusing existing index ({existing} chunks)")
+                embeddings = wait_for_embeddings()
+                if not embeddings:
+                    return None, None, "Failed to initialize embeddings"
+                vectorstore = create_vector_store(embeddings, persist_directory, collection_name)
+                st.session_state.file_set = None  # rebuilt lazily from metadata
+                st.session_state.embedding_matrix = None  # Chroma index search
+                status.update(label="✅ Repository loaded from cache!", state="complete")
+                remember_repo(key, vectorstore, existing)
+                return vectorstore, existing, None
+            
+            # Forced re-index, or leftovers of an interrupted ingest
+            if discard_index(persist_directory, collection_name):
+                st.write("🧹 Dropped existing index")
+            
+            st.write("📦 Connecting to GitHub...")
+            
             # Create progress bar
             progress_bar = st.progress(0)
             progress_text = st.empty()
@@ -240,114 +543,159 @@ def load_github_repo(repo_url: str, branch: str = "main") -> tuple:
             )
             st.write(f"✅ Created {len(chunks)} chunks")
             
-            # Step 3: Create embeddings
-            st.write("🧠 Generating embeddings...")
-            embeddings = initialize_embeddings()
+            # Step 3: Embed + insert in batches instead of one giant from_documents() call
+            st.write("🧠 Generating embeddings and building vector database...")
+            embeddings = wait_for_embeddings()
             if not embeddings:
                 return None, None, "Failed to initialize embeddings"
+            vectorstore = create_vector_store(embeddings, persist_directory, collection_name)
             
-            # Step 4: Create vector store with sanitized directory name
-            st.write("💾 Building vector database...")
+            # Keep a normalized in-memory copy of the vectors for fast exact search
+            embedding_matrix = EmbeddingMatrix()
+            add_documents_in_batches(vectorstore, chunks, embeddings, on_batch=embedding_matrix.add_batch)
+            mark_index_complete(persist_directory, collection_name, len(chunks))
+            st.session_state.embedding_matrix = embedding_matrix
             
-            # Sanitize repo_url to create a valid Windows directory name
-            # Remove invalid characters: < > : " / \ | ? *
-            safe_name = repo_url
-            # Remove protocol if full URL
-            safe_name = safe_name.replace("https://", "").replace("http://", "")
-            # Remove domain
-            safe_name = safe_name.replace("github.com/", "")
-            # Replace invalid Windows characters with underscores
-            invalid_chars = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
-            for char in invalid_chars:
-                safe_name = safe_name.replace(char, '_')
-            # Remove any double underscores
-            while '__' in safe_name:
-                safe_name = safe_name.replace('__', '_')
-            # Remove trailing underscores
-            safe_name = safe_name.strip('_')
+            # Remember the file list so "what files..." never hits the DB
+            sources = (c.metadata.get('source', '') for c in chunks)
+            st.session_state.file_set = {source for source in sources if is_repo_file(source)}
             
-            vectorstore = Chroma.from_documents(
-                documents=chunks,
-                embedding=embeddings,
-                persist_directory=f"./chroma_db_{safe_name}"
-            )
+            # Indexes of earlier commits are superseded by this one
+            if commit:
+                drop_stale_collections(persist_directory, collection_name)
             
             status.update(label="✅ Repository loaded successfully!", state="complete")
         
+        remember_repo(key, vectorstore, len(chunks))
         return vectorstore, len(chunks), None
         
     except Exception as e:
         return None, None, str(e)
 
-def get_file_list_from_vectorstore(vectorstore: Chroma) -> str:
-    """Get all unique files from the vectorstore metadata"""
-    try:
-        # Get all documents from vectorstore (no limit)
-        all_docs = vectorstore.get(limit=10000)  # Set high limit to get all docs
-        
-        logger.info(f"Retrieved {len(all_docs['ids'])} documents from vectorstore")
-        
-        # Extract unique file paths
-        files = set()
-        for metadata in all_docs['metadatas']:
+def is_repo_file(source: str) -> bool:
+    """True for real file paths (not git history / binary placeholders)"""
+    return bool(source) and source != 'git_history' and not source.startswith('[BINARY')
+
+def collect_files_from_vectorstore(vectorstore: "Chroma", page_size: int = 1000) -> set:
+    """Collect unique file paths by paging through metadata only (no document text)"""
+    files = set()
+    offset = 0
+    while True:
+        page = vectorstore.get(limit=page_size, offset=offset, include=["metadatas"])
+        for metadata in page['metadatas']:
             source = metadata.get('source', '')
-            if source and source != 'git_history' and not source.startswith('[BINARY'):
+            if is_repo_file(source):
                 files.add(source)
-        
-        logger.info(f"Found {len(files)} unique files")
-        
-        # Sort and format
-        sorted_files = sorted(list(files))
-        
-        if not sorted_files:
-            return "### ⚠️ No files found in the repository.\n\nThis might indicate an issue with repository loading."
-        
-        # Group by directory
-        file_tree = {}
-        for file in sorted_files:
-            if '/' in file:
-                dir_name = file.rsplit('/', 1)[0]
-                file_name = file.rsplit('/', 1)[1]
-                if dir_name not in file_tree:
-                    file_tree[dir_name] = []
-                file_tree[dir_name].append(file_name)
-            else:
-                if 'root' not in file_tree:
-                    file_tree['root'] = []
-                file_tree['root'].append(file)
-        
-        # Format output
-        output = ["### 📁 Repository Structure\n"]
-        
-        # Root files first
-        if 'root' in file_tree:
-            output.append("**Root files:**")
-            for file in sorted(file_tree['root']):
-                output.append(f"- `{file}`")
-            output.append("")
-        
-        # Then directories
-        for dir_name in sorted([d for d in file_tree.keys() if d != 'root']):
-            output.append(f"**`{dir_name}/`**")
-            for file in sorted(file_tree[dir_name]):
-                output.append(f"  - `{file}`")
-            output.append("")
-        
-        output.append(f"\n**Total files:** {len(sorted_files)}")
-        
-        return "\n".join(output)
+        if len(page['ids']) < page_size:
+            break
+        offset += page_size
+    
+    logger.info(f"Scanned {offset + len(page['ids'])} documents from vectorstore")
+    return files
+
+@st.cache_data(show_spinner=False)
+def build_file_list(collection_name: str, doc_count: int, _vectorstore: "Chroma", _file_set) -> str:
+    """
+    Build the repository-structure Markdown, memoized per (collection, doc count).
+    
+    The collection name includes the indexed commit SHA, so another branch
+    or a new commit never gets a stale tree, while repeat "list files"
+    questions skip both the metadata scan and the grouping/sorting.
+    Underscore args are not part of the cache key.
+    """
+    # Prefer the file set captured at ingestion time - zero DB hit
+    files = _file_set
+    if files is None:
+        files = collect_files_from_vectorstore(_vectorstore)
+    
+    logger.info(f"Found {len(files)} unique files")
+    
+    if not files:
+        return "### ⚠️ No files found in the repository.\n\nThis might indicate an issue with repository loading."
+    
+    # Group by directory (single pass, no membership checks)
+    file_tree = defaultdict(list)
+    for file in files:
+        head, _, tail = file.rpartition('/')
+        file_tree[head or 'root'].append(tail)
+    
+    # Format output - each directory's files are sorted exactly once
+    output = ["### 📁 Repository Structure\n"]
+    
+    # Root files first
+    root_files = file_tree.pop('root', None)
+    if root_files:
+        output.append("**Root files:**")
+        for file in sorted(root_files):
+            output.append(f"- `{file}`")
+        output.append("")
+    
+    # Then directories
+    for dir_name, dir_files in sorted(file_tree.items()):
+        output.append(f"**`{dir_name}/`**")
+        for file in sorted(dir_files):
+            output.append(f"  - `{file}`")
+        output.append("")
+    
+    output.append(f"\n**Total files:** {len(files)}")
+    
+    return "\n".join(output)
+
+def get_file_list_from_vectorstore(vectorstore: "Chroma") -> str:
+    """Get all unique files from the vectorstore metadata"""
+    try:
+        return build_file_list(
+            vectorstore._collection.name,
+            st.session_state.document_count,
+            vectorstore,
+            st.session_state.get('file_set')
+        )
     except Exception as e:
         logger.error(f"Error getting file list: {e}")
         import traceback
         logger.error(traceback.format_exc())
         return f"Unable to retrieve file list. Error: {str(e)}"
 
-def generate_answer(query: str, vectorstore: Chroma, llm) -> Dict:
-    """Generate answer using RAG"""
+def result_ids(results) -> tuple:
+    """
+    Per-chunk cache key: the Chroma id when present, else a digest of the
+    chunk's text and metadata (never just its location - chunks without
+    line numbers share url/source)
+    """
+    return tuple(getattr(doc, "id", None) or chunk_digest(doc) for doc in results)
+
+def chunk_digest(doc) -> str:
+    """Digest of everything the formatted context/citation is built from"""
+    digest = hashlib.blake2b(doc.page_content.encode("utf-8", errors="surrogatepass"), digest_size=16)
+    digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def format_results(ids: tuple, _results) -> Tuple[str, List[Dict]]:
+    """
+    LLM context + citations for a set of retrieved chunks, memoized by ids.
+    
+    The same chunks come back for repeat and similar questions, so their
+    formatting is done once. _results is not part of the cache key.
+    """
+    from services.retrieval import format_context_and_citations
+    return format_context_and_citations(_results)
+
+def generate_answer(query: str, vectorstore: "Chroma", llm, stream: bool = False) -> Dict:
+    """
+    Generate answer using RAG
+    
+    With stream=True, a freshly generated "answer" is a token generator
+    (render it with st.write_stream); the full text is written back into
+    the result and cached once the generator is exhausted. Cached answers,
+    file listings and errors are always plain strings.
+    """
+    from services.retrieval import retrieve_context
+    from services.semantic_cache import SemanticCache
+    
     try:
         # Special case: Detect file listing questions
-        file_keywords = ['what files', 'list files', 'show files', 'files in', 'repo structure', 'repository structure', 'what is in']
-        if any(keyword in query.lower() for keyword in file_keywords):
+        if FILE_QUESTION_RE.search(query):
             file_list = get_file_list_from_vectorstore(vectorstore)
             return {
                 "answer": file_list,
@@ -355,65 +703,69 @@ def generate_answer(query: str, vectorstore: Chroma, llm) -> Dict:
                 "context_used": 0
             }
         
+        # Step 0: Reuse the answer to a near-identical earlier question
+        cache = SemanticCache.for_vectorstore(vectorstore)
+        query_embedding = vectorstore.embeddings.embed_query(query)
+        cached = cache.lookup(query_embedding)
+        if cached:
+            return cached
+        
         # Step 1: Retrieve relevant context
-        results = retrieve_context(query, vectorstore, k=5)
+        results = retrieve_context(
+            query, vectorstore, k=INITIAL_K,
+            embedding_matrix=st.session_state.get('embedding_matrix'),
+            query_embedding=query_embedding
+        )
         
         if not results:
             return {
-                "answer": "I couldn't find any relevant information in the repository to answer your question.",
+                "answer": NO_CONTEXT_ANSWER,
                 "citations": [],
                 "context_used": 0
             }
         
-        # Step 2: Format context for LLM
-        context = format_context_for_llm(results)
+        # Step 2: Format context for LLM (and citations, from the same cache entry)
+        context, citations = format_results(result_ids(results), results)
         
         # Step 3: Generate answer
         # UPDATED PROMPT: Enforce structured, precise output
-        prompt = f"""You are a senior software engineer assistant. Answer the user's question about the repository.
-
-CONTEXT FROM REPOSITORY:
-{context}
-
-USER QUESTION: {query}
-
-INSTRUCTIONS:
-1. Be **precise** and avoid fluff.
-2. Use **Markdown structure** (headers, bullet points).
-3. Start with a direct answer.
-4. If showing code, use syntax highlighting.
-5. Reference specific files/functions.
-
-FORMAT:
-### Summary
-[Brief summary of the answer]
-
-### Key Details
-- [Bullet point 1]
-- [Bullet point 2]
-- [Bullet point 3]
-
-### Code Reference (if applicable)
-```[language]
-[code snippet]
-```
-
-### 🛠️ Command Breakdown (if applicable)
-- `[command]`: [What this command does and why it is used]
-"""
-        
-        response = llm.invoke(prompt)
-        answer = response.content
+        prompt = ANSWER_PROMPT.substitute(context=context, query=query)
         
-        # Step 4: Get citations
-        citations = get_citations(results)
-        
-        return {
-            "answer": answer,
+        result = {
+            "answer": "",
             "citations": citations,
             "context_used": len(results)
         }
         
+        def more_context():
+            """Second, wider retrieval pass when the LLM asks for it"""
+            expanded = retrieve_context(
+                query, vectorstore, k=EXPANDED_K,
+                embedding_matrix=st.session_state.get('embedding_matrix'),
+                query_embedding=query_embedding
+            )
+            context, result["citations"] = format_results(result_ids(expanded), expanded)
+            result["context_used"] = len(expanded)
+            return llm.stream(ANSWER_PROMPT.substitute(context=context, query=query))
+        
+        if stream:
+            def stream_tokens():
+                parts = []
+                for text in expand_on_sentinel(llm.stream(prompt), more_context):
+                    parts.append(text)
+                    yield text
+                result["answer"] = "".join(parts)
+                cache.store(query_embedding, result)
+            
+            result["answer"] = stream_tokens()
+            return result
+        
+        response = llm.invoke(prompt)
+        result["answer"] = "".join(expand_on_sentinel([response], more_context))
+        cache.store(query_embedding, result)
+        
+        return result
+        
     except Exception as e:
         logger.error(f"Error generating answer: {e}")
         return {
@@ -430,21 +782,10 @@ def render_header():
     """Render app header"""
     # Only show the big header if no repository is loaded
     if not st.session_state.repo_loaded:
-        st.markdown("""
-        <div class="header">
-            <h1>🤖 RepoChat</h1>
-            <p>Instant AI answers for any GitHub repository</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(HEADER_HTML, unsafe_allow_html=True)
     else:
         # Minimal header for chat mode
-        st.markdown("""
-        <div style="padding: 1rem 0; text-align: center; border-bottom: 1px solid #e8e3dc; margin-bottom: 1rem;">
-            <span style="font-size: 1.2rem; font-weight: 600; color: #2d2d2d;">🤖 RepoChat</span>
-            <span style="color: #d4cfc4; margin: 0 0.5rem;">|</span>
-            <span style="color: #6b6b6b;">{repo}</span>
-        </div>
-        """.format(repo=st.session_state.current_repo), unsafe_allow_html=True)
+        st.markdown(CHAT_HEADER_HTML.format(repo=st.session_state.current_repo), unsafe_allow_html=True)
 
 def render_sidebar():
     """Render sidebar with repo loading"""
@@ -461,19 +802,11 @@ def render_sidebar():
             st.subheader("🌟 Visual Discovery")
             st.write("Pick a popular repo to start instantly:")
             
-            # Curated popular repositories
-            EXAMPLES = [
-                {"repo": "langchain-ai/langchain", "name": "LangChain", "icon": "🦜"},
-                {"repo": "facebook/react", "name": "React", "icon": "⚛️"},
-                {"repo": "fastapi/fastapi", "name": "FastAPI", "icon": "🚀"},
-                {"repo": "srinath2934/execflow-ai", "name": "ExecFlow", "icon": "⚙️"},
-            ]
-            
             # Create a 2x2 grid for visuals
             col_a, col_b = st.columns(2)
             selected_example = None
             
-            for i, example in enumerate(EXAMPLES):
+            for i, example in enumerate(EXAMPLE_REPOS):
                 target_col = col_a if i % 2 == 0 else col_b
                 with target_col:
                     if st.button(f"{example['icon']} {example['name']}", use_container_width=True, help=f"Explore {example['repo']}"):
@@ -498,17 +831,21 @@ def render_sidebar():
                 key="branch_input"
             )
             
+            force_reindex = st.checkbox(
+                "♻️ Force re-index",
+                value=False,
+                help="Ignore the saved index for this repo and download + embed it again",
+                key="force_reindex"
+            )
+            
             load_button = st.button("🚀 Load Repository", use_container_width=True, type="primary")
             
             # Handle loading (either from button or example card)
             active_repo = selected_example if selected_example else (repo_url if load_button else None)
             
             if active_repo:
-                # Clear previous state
-                st.cache_resource.clear()
-                
                 with st.spinner(f"✨ Magical extraction of {active_repo}..."):
-                    vectorstore, doc_count, error = load_github_repo(active_repo, branch)
+                    vectorstore, doc_count, error = load_github_repo(active_repo, branch, force_reindex)
                     
                     if error:
                         st.error(f"❌ Error: {error}")
@@ -519,6 +856,8 @@ def render_sidebar():
                         st.session_state.current_repo = active_repo
                         st.session_state.show_load_form = False
                         
+                        clear_chat_log()
+                        st.session_state.older_count = 0
                         st.session_state.messages = [{
                             "role": "assistant",
                             "content": f"🎉 **Magical Ingestion Complete!**\n\nI've analyzed `{active_repo}` and structured **{doc_count}** segments of intelligence. I'm ready for your questions."
@@ -539,27 +878,21 @@ def render_sidebar():
         st.subheader("📊 Status")
         
         if st.session_state.repo_loaded:
-            # Simplified status since top part already confirms usage
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Docs", st.session_state.document_count)
-            with col2:
-                st.metric("Msgs", len(st.session_state.messages))
+            # Simplified status since top part already confirms usage. The
+            # message count is shown by the chat fragment, which (unlike the
+            # sidebar) reruns when a message is sent.
+            st.metric("Docs", st.session_state.document_count)
         else:
             if not st.session_state.get('show_load_form', True):
                  # Should not happen ideally but fallback
                  st.info("👆 Load a repository above")
             elif 'status_placeholder' in locals():
                  with status_placeholder.container():
-                    st.markdown("""
-                    <div class="status-badge status-warning">⚠️ No Repository Loaded</div>
-                    """, unsafe_allow_html=True)
+                    st.markdown(NO_REPO_BADGE_HTML, unsafe_allow_html=True)
                     st.info("👆 Load a repository above to start!")
             else:
                  # Initial render state
-                 st.markdown("""
-                <div class="status-badge status-warning">⚠️ No Repository Loaded</div>
-                """, unsafe_allow_html=True)
+                 st.markdown(NO_REPO_BADGE_HTML, unsafe_allow_html=True)
         
         st.divider()
         
@@ -568,10 +901,13 @@ def render_sidebar():
         
         # Use standard buttons which are clearer than the custom dark ones
         if st.button("🗑️ Clear Chat"):
+            clear_chat_log()
             st.session_state.messages = []
+            st.session_state.older_count = 0
             st.rerun()
         
         if st.button("🔄 Reset All"):
+            clear_chat_log()
             st.session_state.clear()
             st.cache_resource.clear()
             st.rerun()
@@ -580,94 +916,72 @@ def render_sidebar():
         
         # Info - More concise
         st.subheader("✨ Features")
-        st.markdown("""
-        🔍 Smart code search  
-        🤖 AI-powered answers  
-        📚 Source citations  
-        ⚡ Fast & accurate
-        """)
+        st.markdown(FEATURES_MD)
         
         st.caption("Powered by Groq LLaMA 3.3 70B")
 
+def format_citation(idx: int, citation: Dict) -> str:
+    """One Markdown line for a source citation"""
+    node = f" · 🔧 `{citation['node_name']}`" if citation['node_name'] else ""
+    return (
+        f"**📄 Source {idx}:** `{citation['file']}` · 📍 lines {citation['lines']}{node}"
+        f" — [🔗 GitHub]({citation['url']})"
+    )
+
+def citations_markdown(citations: List[Dict]) -> str:
+    """All citations of a message as one Markdown string"""
+    return "\n\n".join(
+        format_citation(idx, citation) for idx, citation in enumerate(citations, 1)
+    )
+
+def render_citations(sources_md: str):
+    """Sources expander: all citations in a single Markdown element"""
+    with st.expander("📚 View Sources", expanded=False):
+        st.markdown(sources_md)
+
+@st.fragment
 def render_chat_interface():
-    """Render main chat interface"""
+    """
+    Render main chat interface
+    
+    Runs as a fragment: submitting a prompt reruns only this function,
+    not the header and sidebar.
+    """
     
     # Check if repository is loaded
     if not st.session_state.repo_loaded:
-        st.markdown("""
-        ##  Welcome to RepoChat!
-        
-        **Get started in 3 easy steps:**
-        
-        1. 📦 **Load a repository** from the sidebar
-        2. ✍️ **Ask questions** about the code
-        3. 📚 **Get AI-powered answers** with source citations
-        """)
+        st.markdown(WELCOME_MD)
         
         st.divider()
         
         # Show example queries
         st.subheader("💡 Try These Example Questions:")
         
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("""
-            **General Questions:**
-            - What does this repository do?
-            - How is the project structured?
-            - What are the main features?
-            
-            **Technical Questions:**
-            - How does authentication work?
-            - Show me the API endpoints
-            - Where is error handling implemented?
-            """)
-        
-        with col2:
-            st.markdown("""
-            **Code Questions:**
-            - What is the main entry point?
-            - How is data validated?
-            - Show me the database schema
-            
-            **Deep Dive:**
-            - Explain the login function
-            - How does caching work?
-            - What dependencies are used?
-            """)
+        for column, questions_md in zip(st.columns(2), EXAMPLE_QUESTIONS_MD):
+            with column:
+                st.markdown(questions_md)
         
         return
     
-    # Display chat messages
-    for i, message in enumerate(st.session_state.messages):
-        if message["role"] == "user":
-            st.markdown(f"""
-            <div class="user-message">
-                <strong>👤 You:</strong><br>
-                {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="bot-message">
-                <strong>🤖 Assistant:</strong><br>
-                {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
+    # Filled in at the end of the run, so it counts this turn's messages too
+    count_slot = st.empty()
+    
+    # Older messages live on disk; only read them when asked for
+    older = load_older_messages(st.session_state.older_count) if st.session_state.older_count else []
+    if len(older) == st.session_state.older_count and os.path.exists(chat_log_path()):
+        if st.button("⬆️ Load older messages"):
+            st.session_state.older_count += MAX_TURNS * 2
+            st.rerun(scope="fragment")
+    
+    # Display chat messages with native chat widgets (no raw HTML per row)
+    for message in older + st.session_state.messages:
+        role = message["role"]
+        with st.chat_message(role, avatar="👤" if role == "user" else "🤖"):
+            st.markdown(message["content"])
             
-            # Show citations if available
-            if "citations" in message and message["citations"]:
-                with st.expander("📚 View Sources", expanded=False):
-                    for idx, citation in enumerate(message["citations"], 1):
-                        st.markdown(f"""
-                        <div class="citation">
-                            <strong>📄 Source {idx}:</strong> {citation['file']}<br>
-                            <strong>📍 Lines:</strong> {citation['lines']}<br>
-                            {f"<strong>🔧 Function/Class:</strong> {citation['node_name']}<br>" if citation['node_name'] else ""}
-                            <a href="{citation['url']}" target="_blank">🔗 View on GitHub</a>
-                        </div>
-                        """, unsafe_allow_html=True)
+            # Show citations if available (Markdown built once, when the message was added)
+            if message.get("citations"):
+                render_citations(message.get("sources_md") or citations_markdown(message["citations"]))
     
     # Chat input - MOVED OUTSIDE of any conditions to ensure it's always accessible
     prompt = st.chat_input("💬 Ask me anything about this repository...")
@@ -676,8 +990,29 @@ def render_chat_interface():
         # Check if repo is loaded
         if not st.session_state.repo_loaded:
             st.error("⚠️ Please load a repository from the sidebar first!")
+            show_message_count(count_slot)
             return
 
+        from services.retrieval import retrieve_context
+        from services.semantic_cache import SemanticCache
+        
+        vectorstore = st.session_state.vectorstore
+        
+        # Start embedding + retrieval right away on a worker thread - they
+        # overlap with LLM init and UI updates instead of running after them.
+        # The query is embedded once and shared by the cache and retrieval.
+        executor = ThreadPoolExecutor(max_workers=1)
+        embedding_future = executor.submit(vectorstore.embeddings.embed_query, prompt)
+        embedding_matrix = st.session_state.embedding_matrix
+        retrieval = executor.submit(
+            lambda: retrieve_context(
+                prompt, vectorstore, k=INITIAL_K,
+                embedding_matrix=embedding_matrix,
+                query_embedding=embedding_future.result()
+            )
+        )
+        executor.shutdown(wait=False)
+        
         # Initialize LLM if needed
         if not st.session_state.llm:
             with st.spinner("🔧 Initializing AI model..."):
@@ -686,6 +1021,7 @@ def render_chat_interface():
         if not st.session_state.llm:
             st.error("❌ **Failed to initialize AI model**")
             st.info("💡 **Fix:** Check that your `GROQ_API_KEY` in the `.env` file is correct")
+            show_message_count(count_slot)
             return
         
         # Add user message
@@ -693,75 +1029,80 @@ def render_chat_interface():
             "role": "user",
             "content": prompt
         })
+        trim_chat_history()
+        
+        # Show the question right away (the history loop above already ran)
+        with st.chat_message("user", avatar="👤"):
+            st.markdown(prompt)
         
         # Generator for structured response
         with st.chat_message("assistant", avatar="🤖"):
             try:
-                with st.spinner("🤔 Thinking..."):
-                    # 1. Retrieve Context (This still takes a moment)
-                    results = retrieve_context(prompt, st.session_state.vectorstore, k=5)
-                    context = format_context_for_llm(results) if results else "No context found."
-                
-                # 2. Prepare Prompt
-                structured_prompt = f"""You are a senior technical writer and software engineer.
-                
-                CONTEXT:
-                {context}
-                
-                QUESTION:
-                {prompt}
-                
-                STRICT OUTPUT FORMAT (Markdown):
+                # 0. Near-duplicate of an earlier question? Skip retrieval + LLM
+                cache = SemanticCache.for_vectorstore(vectorstore)
+                query_embedding = embedding_future.result()
+                cached = cache.lookup(query_embedding)
                 
-                ### 🎯 Summary
-                [Direct, 1-sentence answer]
+                if cached:
+                    retrieval.cancel()
+                    response_text = cached["answer"]
+                    citations = cached["citations"]
+                    st.markdown(response_text)
+                else:
+                    with st.spinner("🤔 Thinking..."):
+                        # 1. Collect the context retrieved in the background
+                        results = retrieval.result()
+                        context, citations = format_results(result_ids(results), results)
+                        context = context or "No context found."
                 
-                ### 🔍 Key Details
-                - [Bullet point 1]
-                - [Bullet point 2]
-                - [Bullet point 3]
+                    # 2. Prepare Prompt
+                    structured_prompt = CHAT_PROMPT.substitute(context=context, question=prompt)
                 
-                ### 💻 Code Reference
-                (Only if relevant, otherwise omit this section)
-                ```[language]
-                [code snippet]
-                ```
+                    def more_context():
+                        """Second, wider retrieval pass when the LLM asks for it"""
+                        nonlocal results, citations
+                        results = retrieve_context(
+                            prompt, vectorstore, k=EXPANDED_K,
+                            embedding_matrix=embedding_matrix,
+                            query_embedding=query_embedding
+                        )
+                        context, citations = format_results(result_ids(results), results)
+                        return st.session_state.llm.stream(
+                            CHAT_PROMPT.substitute(context=context or "No context found.", question=prompt)
+                        )
                 
-                ### 🛠️ Command Breakdown
-                (If you suggested terminal commands like pip, git, or python, explain exactly what each flag/part does here)
-                - `[command part]`: [Explanation]
-
-                ### 🔗 Source Files
-                (List the filenames used)
-                """
-                
-                # 3. Stream the Response
-                stream = st.session_state.llm.stream(structured_prompt)
-                response_text = st.write_stream(stream)
+                    # 3. Stream the Response
+                    stream = st.session_state.llm.stream(structured_prompt)
+                    response_text = st.write_stream(coalesce_stream(expand_on_sentinel(stream, more_context)))
+                    
+                    cache.store(query_embedding, {
+                        "answer": response_text,
+                        "citations": citations,
+                        "context_used": len(results)
+                    })
                 
                 # 4. Show Citations below the stream
-                citations = get_citations(results) if results else []
-                if citations:
-                    with st.expander("📚 View Sources", expanded=False):
-                        for idx, citation in enumerate(citations, 1):
-                            st.markdown(f"""
-                            <div class="citation">
-                                <strong>📄 Source {idx}:</strong> {citation['file']}<br>
-                                <strong>📍 Lines:</strong> {citation['lines']}<br>
-                                {f"<strong>🔧 Function/Class:</strong> {citation['node_name']}<br>" if citation['node_name'] else ""}
-                                <a href="{citation['url']}" target="_blank">🔗 View on GitHub</a>
-                            </div>
-                            """, unsafe_allow_html=True)
+                sources_md = citations_markdown(citations) if citations else ""
+                if sources_md:
+                    render_citations(sources_md)
                 
-                # Add complete message to history
+                # Add complete message to history; later reruns reuse sources_md
                 st.session_state.messages.append({
                     "role": "assistant",
                     "content": response_text,
-                    "citations": citations
+                    "citations": citations,
+                    "sources_md": sources_md
                 })
+                trim_chat_history()
                 
             except Exception as e:
                 st.error(f"Error: {e}")
+    
+    show_message_count(count_slot)
+
+def show_message_count(slot):
+    """Message count of the current chat window, in the chat fragment"""
+    slot.caption(f"💬 {len(st.session_state.messages)} messages")
 
 # ============================================================================
 # MAIN APP
@@ -773,6 +1114,9 @@ def main():
     # Initialize session state
     init_session_state()
     
+    # Begin loading the embeddings model while the UI renders
+    start_embeddings_warmup()
+    
     # Render UI
     render_header()
     render_sidebar()
@@ -3,12 +3,34 @@ GitHub RAG Loader - Clean implementation that works around LangChain bugs
 """
 
 import os
+import hashlib
 import requests
-import base64
-from typing import List, Tuple
+import tarfile
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from requests.adapters import HTTPAdapter
 from langchain_core.documents import Document
 from dotenv import load_dotenv
 
+# Large tree listings parse several times faster with orjson; stdlib otherwise
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# File downloads are network-bound: many concurrent requests over a shared
+# keep-alive connection pool
+MAX_WORKERS = 32
+POOL_SIZE = 64
+
+# Seconds before a stalled request (or tarball stream read) gives up
+REQUEST_TIMEOUT = 60
+
+# ETags + bodies of the tree request: an unchanged tree comes back as a
+# body-less 304, which doesn't count against the API rate limit
+HTTP_CACHE_DIR = ".github_cache"
+
 
 class GitHubRepoLoader:
     """
@@ -21,7 +43,8 @@ class GitHubRepoLoader:
         repo: str,  # Format: "owner/repo"
         branch: str = "main",
         access_token: str = None,
-        file_extensions: Tuple[str, ...] = (".py", ".md", ".js", ".txt")
+        file_extensions: Tuple[str, ...] = (".py", ".md", ".js", ".txt"),
+        http_cache_dir: Optional[str] = HTTP_CACHE_DIR
     ):
         """
         Initialize the GitHub loader.
@@ -31,15 +54,150 @@ class GitHubRepoLoader:
             branch: Branch name (default: "main")
             access_token: GitHub personal access token (optional for public repos)
             file_extensions: Tuple of file extensions to include
+            http_cache_dir: Where the tree's ETag/body are kept (None disables)
         """
         self.repo = repo
         self.branch = branch
         self.access_token = access_token
-        self.file_extensions = file_extensions
+        self.file_extensions = tuple(file_extensions)  # str.endswith takes the tuple directly
+        self.http_cache_dir = http_cache_dir
         self.headers = {}
         
         if access_token:
             self.headers["Authorization"] = f"token {access_token}"
+        
+        # One session for all requests so TCP/TLS connections are reused
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+    
+    def _get_with_etag(self, url: str) -> requests.Response:
+        """
+        GET with If-None-Match; a 304 is answered from the on-disk copy.
+        
+        The returned response always carries the full body (status 200 on
+        a cache hit).
+        """
+        if not self.http_cache_dir:
+            return self.session.get(url, timeout=REQUEST_TIMEOUT)
+        
+        key = hashlib.sha256(url.encode()).hexdigest()
+        body_path = os.path.join(self.http_cache_dir, f"{key}.json")
+        etag_path = os.path.join(self.http_cache_dir, f"{key}.etag")
+        
+        headers = {}
+        if os.path.exists(body_path) and os.path.exists(etag_path):
+            with open(etag_path, encoding="utf-8") as f:
+                headers["If-None-Match"] = f.read()
+        
+        response = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        
+        if response.status_code == 304:
+            print(f"♻️  Tree not modified, using cached copy")
+            with open(body_path, "rb") as f:
+                response._content = f.read()
+            response.status_code = 200
+        elif response.status_code == 200 and response.headers.get("ETag"):
+            os.makedirs(self.http_cache_dir, exist_ok=True)
+            with open(body_path, "wb") as f:
+                f.write(response.content)
+            with open(etag_path, "w", encoding="utf-8") as f:
+                f.write(response.headers["ETag"])
+        
+        return response
+    
+    def _make_document(self, file_info: dict, content: str) -> Document:
+        """Wrap one file's content in a Document with the loader's metadata."""
+        file_path = file_info["path"]
+        return Document(
+            page_content=content,
+            metadata={
+                "source": file_path,
+                "repo": self.repo,
+                "branch": self.branch,
+                "sha": file_info["sha"],
+                "url": f"https://github.com/{self.repo}/blob/{self.branch}/{file_path}",
+                "size": file_info.get("size", 0)
+            }
+        )
+    
+    def _fetch_one(self, file_info: dict) -> Optional[Document]:
+        """
+        Download a single file and wrap it in a Document.
+        
+        Returns None (after printing why) if the file can't be loaded.
+        """
+        file_path = file_info["path"]
+        
+        try:
+            # Get raw file bytes (no Contents API round-trip / base64)
+            raw_url = f"https://raw.githubusercontent.com/{self.repo}/{self.branch}/{file_path}"
+            content_response = self.session.get(raw_url, timeout=REQUEST_TIMEOUT)
+            content_response.raise_for_status()
+            
+            return self._make_document(file_info, content_response.content.decode("utf-8"))
+            
+        except Exception as e:
+            print(f"    ⚠️  Failed to load {file_path}: {e}")
+            return None
+    
+    def load_tarball(self, file_infos: List[dict]) -> List[Document]:
+        """
+        Load the given tree entries from a single tarball download of the branch.
+        
+        One request for the whole repository instead of one per file; the
+        archive is streamed and only the wanted members are decoded. Files
+        the archive leaves out (export-ignore in .gitattributes) are
+        downloaded one by one afterwards.
+        
+        Args:
+            file_infos: Tree entries (path, sha, size) to extract
+        
+        Returns:
+            List of LangChain Document objects
+        """
+        wanted = {f["path"]: f for f in file_infos}
+        tarball_url = f"https://api.github.com/repos/{self.repo}/tarball/{self.branch}"
+        print(f"📦 Downloading repository tarball...")
+        
+        response = self.session.get(tarball_url, stream=True, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        
+        # Undo any transfer-level gzip so tarfile only sees the archive itself
+        response.raw.decode_content = True
+        documents = []
+        with response, tarfile.open(fileobj=response.raw, mode="r|gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                # Members live under a "<owner>-<repo>-<sha>/" top-level directory
+                file_info = wanted.get(member.name.partition("/")[2])
+                if file_info is None:
+                    continue
+                content = tar.extractfile(member).read().decode("utf-8", errors="replace")
+                documents.append(self._make_document(file_info, content))
+                del wanted[file_info["path"]]
+                
+                # Everything wanted is in - don't download the rest of the archive
+                if not wanted:
+                    break
+        
+        if wanted:
+            print(f"📥 {len(wanted)} files not in the tarball (export-ignore), loading them one by one")
+            documents.extend(self.load_files(list(wanted.values())))
+        return documents
+    
+    def load_files(self, file_infos: List[dict]) -> List[Document]:
+        """Download the given tree entries one request each, in parallel."""
+        documents = []
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = executor.map(self._fetch_one, file_infos)
+            for i, (file_info, doc) in enumerate(zip(file_infos, results), 1):
+                if doc is not None:
+                    print(f"  [{i}/{len(file_infos)}] Loaded: {file_info['path']}")
+                    documents.append(doc)
+        return documents
     
     def load(self) -> List[Document]:
         """
@@ -53,7 +211,7 @@ class GitHubRepoLoader:
         print(f"🔍 Fetching repository tree from GitHub...")
         
         try:
-            response = requests.get(tree_url, headers=self.headers)
+            response = self._get_with_etag(tree_url)
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
             print(f"❌ Error: {e}")
@@ -61,52 +219,28 @@ class GitHubRepoLoader:
             print(f"💡 Tip: Check if the repository exists and the branch name is correct")
             raise
         
-        tree_data = response.json()
+        tree_data = json_loads(response.content)
         all_files = tree_data.get("tree", [])
         
         # Step 2: Filter files by extension
         filtered_files = [
             f for f in all_files 
-            if f["type"] == "blob" and any(f["path"].endswith(ext) for ext in self.file_extensions)
+            if f["type"] == "blob" and f["path"].endswith(self.file_extensions)
         ]
         
         print(f"📁 Found {len(filtered_files)} files matching extensions: {self.file_extensions}")
         
-        # Step 3: Load each file's content
-        documents = []
-        
-        for i, file_info in enumerate(filtered_files, 1):
-            file_path = file_info["path"]
-            print(f"  [{i}/{len(filtered_files)}] Loading: {file_path}")
-            
-            try:
-                # Get file content via GitHub API
-                content_url = f"https://api.github.com/repos/{self.repo}/contents/{file_path}?ref={self.branch}"
-                content_response = requests.get(content_url, headers=self.headers)
-                content_response.raise_for_status()
-                
-                content_data = content_response.json()
-                
-                # Decode base64 content
-                content = base64.b64decode(content_data["content"]).decode("utf-8")
-                
-                # Create LangChain Document
-                doc = Document(
-                    page_content=content,
-                    metadata={
-                        "source": file_path,
-                        "repo": self.repo,
-                        "branch": self.branch,
-                        "sha": file_info["sha"],
-                        "url": content_data.get("html_url", ""),
-                        "size": file_info.get("size", 0)
-                    }
-                )
-                documents.append(doc)
-                
-            except Exception as e:
-                print(f"    ⚠️  Failed to load {file_path}: {e}")
-                continue
+        # Step 3: Load file contents - one tarball, or file by file if that fails
+        # (mid-stream resets/timeouts come from urllib3 or as OSError, since
+        # the archive is read from response.raw)
+        try:
+            documents = self.load_tarball(filtered_files)
+        except (
+            requests.exceptions.RequestException, urllib3.exceptions.HTTPError,
+            OSError, tarfile.TarError
+        ) as e:
+            print(f"⚠️  Tarball download failed ({e}), loading files one by one")
+            documents = self.load_files(filtered_files)
         
         print(f"\n✅ Successfully loaded {len(documents)} documents from {self.repo}")
         return documents
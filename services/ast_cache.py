@@ -0,0 +1,113 @@
+"""
+AST Cache - Persist AST splitting results across runs
+Learn: How to skip re-parsing Python files whose content hasn't changed
+"""
+from typing import List, Optional, Tuple
+import hashlib
+import logging
+import os
+import pickle
+
+logger = logging.getLogger(__name__)
+
+# Where cached chunk lists are kept (one pickle file per entry)
+AST_CACHE_DIR = os.getenv("AST_CACHE_DIR", "./.cache/ast")
+
+# Bump when the chunk layout produced by the AST splitter changes
+AST_CACHE_VERSION = "v1"
+
+# Oldest entries (by last use) are removed beyond this many files
+AST_CACHE_MAX_ENTRIES = 20000
+
+# Eviction scans the directory, so it only runs every this many writes
+EVICTION_INTERVAL = 256
+
+# (page_content, chunk-specific metadata) per chunk
+CachedChunks = List[Tuple[str, dict]]
+
+_writes_since_eviction = 0
+
+
+def cache_key(*parts: str) -> str:
+    """
+    SHA-256 over the cache version and everything the result depends on.
+
+    LEARN: Keying by content instead of path/commit means a file that
+    didn't change between two commits (most of them) still hits.
+    """
+    digest = hashlib.sha256(AST_CACHE_VERSION.encode())
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(part.encode("utf-8", errors="surrogatepass"))
+    return digest.hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(AST_CACHE_DIR, key[:2], f"{key}.pkl")
+
+
+def get(key: str) -> Optional[CachedChunks]:
+    """Cached chunks for key, or None on a miss / unreadable entry"""
+    path = _entry_path(key)
+    try:
+        with open(path, "rb") as f:
+            chunks = pickle.load(f)
+        os.utime(path)  # mtime doubles as "last used" for eviction
+        return chunks
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        logger.debug(f"Unreadable AST cache entry {key}: {e}")
+        return None
+
+
+def put(key: str, chunks: CachedChunks) -> None:
+    """Store chunks under key (write to a temp file, then rename)"""
+    global _writes_since_eviction
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(chunks, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write AST cache entry: {e}")
+        return
+
+    _writes_since_eviction += 1
+    if _writes_since_eviction >= EVICTION_INTERVAL:
+        _writes_since_eviction = 0
+        evict()
+
+
+def evict(max_entries: int = AST_CACHE_MAX_ENTRIES) -> int:
+    """
+    Delete least-recently-used entries beyond max_entries.
+
+    Returns:
+        Number of entries removed
+    """
+    entries = []
+    for root, _, files in os.walk(AST_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+
+    excess = len(entries) - max_entries
+    if excess <= 0:
+        return 0
+
+    entries.sort()
+    removed = 0
+    for _, path in entries[:excess]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+    logger.info(f"🧹 Evicted {removed} AST cache entries")
+    return removed
@@ -10,8 +10,15 @@ This ensures maximum context preservation for code RAG systems.
 """
 
 import ast
+import multiprocessing
 import os
-from typing import List, Dict, Optional
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import List, Dict, Iterator, Optional, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 try:
     from langchain_text_splitters import Language
@@ -21,6 +28,8 @@ except ImportError:
 from langchain_core.documents import Document
 import logging
 
+from services import ast_cache
+
 # Import notebook parser
 try:
     from services.notebook_parser import parse_notebook, is_notebook_file
@@ -33,6 +42,46 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# One splitter per (language, chunk_size, chunk_overlap)
+SPLITTER_CACHE_SIZE = 32
+
+# Extension -> splitter language for the language-aware fallback
+LANGUAGE_MAP = MappingProxyType({
+    '.py': Language.PYTHON,
+    '.js': Language.JS,
+    '.ts': Language.TS,
+    '.md': Language.MARKDOWN,
+    '.java': Language.JAVA,
+    '.cpp': Language.CPP,
+    '.go': Language.GO,
+    '.rs': Language.RUST,
+})
+
+NEWLINE_RE = re.compile(r'\n')
+
+# Import fallback for files that don't parse: the file's leading run of
+# import / comment / blank lines, and the import lines within it
+_LINE_SPACE = r'[ \t\r\f\v]*'
+LEADING_IMPORTS_RE = re.compile(
+    rf'(?:{_LINE_SPACE}(?:(?:import|from) [^\n]*|#[^\n]*)?(?:\n|\Z))*'
+)
+IMPORT_LINE_RE = re.compile(rf'^{_LINE_SPACE}(?:import|from) [^\n]*', re.MULTILINE)
+
+# AST nodes that become their own chunk
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+DEFINITION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# Between definitions packed into one chunk
+UNIT_SEPARATOR = "\n\n"
+
+# Splitting is CPU-bound (GIL), so large repos are split in worker
+# processes. Every worker starts fresh (forkserver/spawn - never a fork of
+# the threaded Streamlit server) and re-imports LangChain, so the pool is
+# only used above this much source text, and with a few workers at most.
+PARALLEL_SPLIT_MIN_BYTES = 8 * 1024 * 1024
+PARALLEL_SPLIT_MAX_WORKERS = 4
+SPLIT_MAP_CHUNKSIZE = 4
+
 
 def process_documents(
     documents: List[Document],
@@ -67,7 +116,7 @@ def process_documents(
     logger.info(f"Overlap: {chunk_overlap} chars")
     
     if strategy == "hybrid":
-        chunks = _hybrid_split(documents, chunk_size, chunk_overlap)
+        chunks = list(_hybrid_split(documents, chunk_size, chunk_overlap))
     elif strategy == "ast":
         chunks = _ast_only_split(documents, chunk_size)
     elif strategy == "language":
@@ -84,85 +133,195 @@ def process_documents(
 # STRATEGY 1: AST-BASED SPLITTING (For Python)
 # ============================================================================
 
+def _line_offsets(code: str) -> List[int]:
+    """Start index of every line - lets nodes be sliced without splitting the file."""
+    return [0, *(match.end() for match in NEWLINE_RE.finditer(code))]
+
+
+def _source_lines(code: str, line_offsets: List[int], first: int, last: int) -> str:
+    """Text of 1-indexed lines first..last (inclusive), without the final newline."""
+    end = line_offsets[last] - 1 if last < len(line_offsets) else len(code)
+    return code[line_offsets[first - 1]:end]
+
+
+def _definition_units(
+    tree: ast.Module,
+    source_text: str,
+    line_offsets: List[int],
+    max_len: float
+) -> List[Tuple[ast.AST, str]]:
+    """
+    (node, code) for every top-level function/class, in source order.
+    
+    A class longer than max_len is replaced by its methods, so big classes
+    still get method-level chunks. Only tree.body (and one level into such
+    classes) is visited - ast.walk would touch every expression in the file.
+    """
+    units = []
+    for node in tree.body:
+        if not isinstance(node, DEFINITION_NODES):
+            continue
+        code = _source_lines(source_text, line_offsets, node.lineno, node.end_lineno)
+        if isinstance(node, ast.ClassDef) and len(code) > max_len:
+            units.extend(
+                (sub, _source_lines(source_text, line_offsets, sub.lineno, sub.end_lineno))
+                for sub in node.body if isinstance(sub, FUNCTION_NODES)
+            )
+        else:
+            units.append((node, code))
+    return units
+
+
+def _pack_units(units: List[Tuple[ast.AST, str]], budget: int) -> List[List[Tuple[ast.AST, str]]]:
+    """
+    Greedily group adjacent units while their joined code fits in budget.
+    
+    Files full of small helpers then produce a few chunks instead of one
+    per helper - fewer, fuller chunks to embed. A unit that alone exceeds
+    the budget becomes its own group.
+    """
+    groups = []
+    current = []
+    current_len = 0
+    for unit in units:
+        added = len(unit[1]) + (len(UNIT_SEPARATOR) if current else 0)
+        if current and current_len + added > budget:
+            groups.append(current)
+            current, current_len = [], 0
+            added = len(unit[1])
+        current.append(unit)
+        current_len += added
+    if current:
+        groups.append(current)
+    return groups
+
+
 def _split_python_with_ast(document: Document, chunk_size: int) -> List[Document]:
     """
     Parse Python code and extract whole functions/classes.
     
+    Adjacent small definitions are packed together up to chunk_size.
+    Results are cached on disk by file content, so unchanged files are
+    not parsed again on later ingests.
+    
     Benefits:
     - Functions stay intact
     - Metadata includes function/class names
     - Easier to cite exact code locations
     """
-    try:
-        tree = ast.parse(document.page_content)
-    except SyntaxError:
-        logger.warning(f"AST parse failed for {document.metadata.get('source')}, falling back")
-        return []
+    source = document.metadata['source']
+    key = ast_cache.cache_key(source, str(chunk_size), document.page_content)
+    parts = ast_cache.get(key)
     
-    chunks = []
-    lines = document.page_content.split('\n')
+    if parts is None:
+        try:
+            parts = _ast_chunk_parts(document.page_content, source, chunk_size)
+        except SyntaxError:
+            logger.warning(f"AST parse failed for {source}, falling back")
+            return []
+        ast_cache.put(key, parts)
     
-    # Extract module-level docstring
-    module_docstring = ast.get_docstring(tree) or ""
+    return [
+        Document(page_content=code, metadata={**document.metadata, **chunk_metadata})
+        for code, chunk_metadata in parts
+    ]
+
+
+def _ast_chunk_parts(source_text: str, source: str, chunk_size: int) -> List[Tuple[str, dict]]:
+    """(chunk text, chunk-specific metadata) for every AST chunk of a file."""
+    tree = ast.parse(source_text)
     
-    # Extract imports
-    imports = _extract_imports(document.page_content)
+    parts = []
+    line_offsets = _line_offsets(source_text)
     
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.AsyncFunctionDef)):
-            start_line = node.lineno - 1  # 0-indexed
-            end_line = node.end_lineno
-            
-            # Extract code for this function/class
-            code_lines = lines[start_line:end_line]
-            code = '\n'.join(code_lines)
-            
-            # Add imports at the top
-            if imports:
-                code = f"# Imports from {document.metadata['source']}\n{imports}\n\n{code}"
-            
-            # Create enriched chunk
-            chunk = Document(
-                page_content=code,
-                metadata={
-                    **document.metadata,
-                    'chunk_type': 'ast_node',
-                    'node_type': 'function' if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) else 'class',
-                    'node_name': node.name,
-                    'start_line': start_line + 1,
-                    'end_line': end_line,
-                    'has_imports': True
-                }
-            )
-            
-            # Only add if within size limit or if it's critical
-            if len(code) <= chunk_size * 1.5:  # Allow 50% overflow for functions
-                chunks.append(chunk)
-            else:
-                # Function too large - needs further splitting
-                logger.debug(f"Function {node.name} too large ({len(code)} chars), splitting")
-                # Will be handled by fallback
+    # Extract imports from the tree parsed above (no second parse)
+    imports = _module_imports(source_text, tree)
+    header = f"# Imports from {source}\n{imports}\n\n" if imports else ""
     
-    return chunks
+    max_len = chunk_size * 1.5  # Allow 50% overflow for a single function/class
+    units = _definition_units(tree, source_text, line_offsets, max_len - len(header))
+    
+    for group in _pack_units(units, chunk_size - len(header)):
+        first_node, last_node = group[0][0], group[-1][0]
+        
+        # Imports at the top, then the grouped definitions
+        code = header + UNIT_SEPARATOR.join(unit_code for _, unit_code in group)
+        
+        if len(code) > max_len:
+            # Function too large - handled by the language-aware fallback
+            logger.debug(f"Function {first_node.name} too large ({len(code)} chars), splitting")
+            continue
+        
+        if len(group) == 1:
+            node_type = 'function' if isinstance(first_node, FUNCTION_NODES) else 'class'
+        else:
+            node_type = 'group'
+        
+        # Enriched chunk (merged with the document's metadata by the caller)
+        parts.append((code, {
+            'chunk_type': 'ast_node',
+            'node_type': node_type,
+            'node_name': ", ".join(node.name for node, _ in group),
+            'start_line': first_node.lineno,
+            'end_line': last_node.end_lineno,
+            'has_imports': True
+        }))
+    
+    return parts
+
+
+def _module_imports(code: str, tree: Optional[ast.Module] = None) -> str:
+    """
+    Top-level import statements of a Python file, from its AST.
+    
+    Unlike a line scan, this also finds imports after a module docstring
+    and handles multi-line imports. Pass the tree if the file was already
+    parsed; falls back to the line scan when the file doesn't parse.
+    """
+    if tree is None:
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return _extract_imports(code)
+    
+    import_nodes = [
+        node for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+    if not import_nodes:
+        return ""
+    
+    line_offsets = _line_offsets(code)
+    return '\n'.join(
+        _source_lines(code, line_offsets, node.lineno, node.end_lineno)
+        for node in import_nodes
+    )
 
 
 def _extract_imports(code: str) -> str:
-    """Extract all import statements from Python code."""
-    imports = []
-    for line in code.split('\n'):
-        stripped = line.strip()
-        if stripped.startswith(('import ', 'from ')):
-            imports.append(line)
-        elif stripped and not stripped.startswith('#'):
-            # Stop at first non-import, non-comment line
-            break
-    return '\n'.join(imports)
+    """
+    Extract leading import statements from Python code (regex scan).
+    
+    The leading block of import/comment/blank lines is matched in one pass,
+    stopping at the first other line; the imports are then picked out of it.
+    """
+    block = LEADING_IMPORTS_RE.match(code).group()
+    return '\n'.join(IMPORT_LINE_RE.findall(block))
 
 
 # ============================================================================
 # STRATEGY 2: IMPORT CONTEXT ENRICHMENT
 # ============================================================================
 
+def _enrich_one(chunk: Document, imports: str) -> Document:
+    """Prepend a file's import block to one of its chunks (once)."""
+    if imports and not chunk.metadata.get('has_imports'):
+        source = chunk.metadata.get('source', '')
+        chunk.page_content = f"# Imports from {source}\n{imports}\n\n{chunk.page_content}"
+        chunk.metadata['has_imports'] = True
+    return chunk
+
+
 def _enrich_with_imports(
     chunks: List[Document],
     import_map: Dict[str, str]
@@ -171,78 +330,63 @@ def _enrich_with_imports(
     Add import context to chunks that don't already have it.
     """
     for chunk in chunks:
-        # Skip if already has imports (from AST)
-        if chunk.metadata.get('has_imports'):
-            continue
-        
-        source = chunk.metadata.get('source', '')
-        if source in import_map and import_map[source]:
-            chunk.page_content = (
-                f"# Imports from {source}\n" +
-                import_map[source] + "\n\n" +
-                chunk.page_content
-            )
-            chunk.metadata['has_imports'] = True
-    
+        imports = import_map.get(chunk.metadata.get('source', ''))
+        if not imports:
+            continue  # nothing to add - leave the chunk untouched
+        _enrich_one(chunk, imports)
     return chunks
 
 
-def _build_import_map(documents: List[Document]) -> Dict[str, str]:
-    """Build a mapping of source files to their imports."""
-    import_map = {}
-    for doc in documents:
-        source = doc.metadata.get('source', '')
-        if source.endswith('.py'):
-            imports = _extract_imports(doc.page_content)
-            if imports:
-                import_map[source] = imports
-
-    return import_map
-
-
 # ============================================================================
 # STRATEGY 3: LANGUAGE-AWARE SPLITTING (Fallback)
 # ============================================================================
 
+@lru_cache(maxsize=SPLITTER_CACHE_SIZE)
+def _get_splitter(
+    language: Optional[Language],
+    chunk_size: int,
+    chunk_overlap: int
+) -> RecursiveCharacterTextSplitter:
+    """
+    Splitter for a language (None = plain text), built once per settings.
+    
+    Splitters keep no state between split_documents calls, so one instance
+    is shared by every file of that language.
+    """
+    if language:
+        return RecursiveCharacterTextSplitter.from_language(
+            language=language,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", " ", ""]
+    )
+
+
 def _language_aware_split(
     documents: List[Document],
     chunk_size: int,
     chunk_overlap: int
 ) -> List[Document]:
-    """Split using language-specific splitters."""
-    all_chunks = []
+    """
+    Split using language-specific splitters.
     
+    Documents are bucketed by language first, so each splitter is called
+    once per language rather than once per file. Chunks come out grouped
+    by language, in file order within each group.
+    """
+    buckets: Dict[Optional[Language], List[Document]] = defaultdict(list)
     for doc in documents:
-        source = doc.metadata.get('source', '')
-        ext = os.path.splitext(source)[1].lower()
-        
-        language_map = {
-            '.py': Language.PYTHON,
-            '.js': Language.JS,
-            '.ts': Language.TS,
-            '.md': Language.MARKDOWN,
-            '.java': Language.JAVA,
-            '.cpp': Language.CPP,
-            '.go': Language.GO,
-            '.rs': Language.RUST,
-        }
-        
-        language = language_map.get(ext)
-        
-        if language:
-            splitter = RecursiveCharacterTextSplitter.from_language(
-                language=language,
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap
-            )
-        else:
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-            )
-        
-        chunks = splitter.split_documents([doc])
-        all_chunks.extend(chunks)
+        ext = os.path.splitext(doc.metadata.get('source', ''))[1].lower()
+        buckets[LANGUAGE_MAP.get(ext)].append(doc)
+    
+    all_chunks = []
+    for language, bucket in buckets.items():
+        splitter = _get_splitter(language, chunk_size, chunk_overlap)
+        all_chunks.extend(splitter.split_documents(bucket))
     
     return all_chunks
 
@@ -253,23 +397,73 @@ def _basic_split(
     chunk_overlap: int
 ) -> List[Document]:
     """Basic recursive character splitting."""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", " ", ""]
-    )
-    return splitter.split_documents(documents)
+    return _get_splitter(None, chunk_size, chunk_overlap).split_documents(documents)
 
 
 # ============================================================================
 # HYBRID STRATEGY (ALL 3 COMBINED)
 # ============================================================================
 
+def _split_one_document(
+    doc: Document,
+    chunk_size: int,
+    chunk_overlap: int
+) -> Tuple[str, List[Document], str, str]:
+    """
+    Split a single file for the hybrid strategy.
+    
+    Module-level (and so picklable) to run in a worker process.
+    
+    Returns:
+        (source, chunks, import block for chunks that lack one, outcome)
+        where outcome is "ast", "ast_failed" (AST tried, fell back),
+        "trivial" (no definitions, AST skipped) or "fallback"
+    """
+    source = doc.metadata.get('source', '')
+    ext = os.path.splitext(source)[1].lower()
+    imports = ""
+    outcome = "fallback"
+    
+    # Preprocess Jupyter notebooks (in place - the loaded documents are only
+    # kept until they are split, so no copy of the Document/metadata is made)
+    if ext == '.ipynb' and is_notebook_file(source):
+        logger.debug(f"Parsing notebook: {source}")
+        doc.page_content = parse_notebook(doc.page_content)
+        doc.metadata['preprocessed'] = 'notebook'
+    
+    # Strategy 1: Try AST for Python files
+    if ext == '.py':
+        code = doc.page_content
+        # Prescan: without a def/class (empty __init__.py, constants, generated
+        # files) the AST splitter has nothing to extract - don't parse at all
+        if 'def ' not in code and 'class ' not in code:
+            chunks = _language_aware_split([doc], chunk_size, chunk_overlap)
+            return source, chunks, _extract_imports(code), "trivial"
+        
+        ast_chunks = _split_python_with_ast(doc, chunk_size)
+        
+        if ast_chunks:
+            # Check if all chunks are reasonable size
+            oversized = [c for c in ast_chunks if len(c.page_content) > chunk_size * 1.5]
+            
+            if not oversized:
+                # Imports are already in every AST chunk
+                return source, ast_chunks, "", "ast"
+            # Some chunks too large - use fallback
+            logger.debug(f"{source}: {len(oversized)} AST chunks oversized, using fallback")
+        outcome = "ast_failed"
+        imports = _module_imports(code)
+    
+    # Strategy 2: Language-aware fallback
+    chunks = _language_aware_split([doc], chunk_size, chunk_overlap)
+    return source, chunks, imports, outcome
+
+
 def _hybrid_split(
     documents: List[Document],
     chunk_size: int,
     chunk_overlap: int
-) -> List[Document]:
+) -> Iterator[Document]:
     """
     Production-grade hybrid approach combining all strategies.
     
@@ -277,60 +471,69 @@ def _hybrid_split(
     1. Try AST-based splitting for Python files
     2. For non-Python or oversized items, use language-aware splitting
     3. Enrich all chunks with import context
-    """
-    all_chunks = []
-    import_map = _build_import_map(documents)
     
+    Steps 1-2 run per file, in a process pool for larger repos. Chunks are
+    enriched and yielded file by file - no second pass over all of them.
+    """
     ast_success = 0
     ast_failed = 0
+    trivial_skipped = 0
     fallback_used = 0
+    with_imports = 0
     
-    for doc in documents:
-        source = doc.metadata.get('source', '')
-        ext = os.path.splitext(source)[1].lower()
-        
-        # Preprocess Jupyter notebooks
-        if ext == '.ipynb' and is_notebook_file(source):
-            logger.debug(f"Parsing notebook: {source}")
-            parsed_content = parse_notebook(doc.page_content)
-            doc = Document(
-                page_content=parsed_content,
-                metadata={**doc.metadata, 'preprocessed': 'notebook'}
-            )
-        
-        # Strategy 1: Try AST for Python files
-        if ext == '.py':
-            ast_chunks = _split_python_with_ast(doc, chunk_size)
-            
-            if ast_chunks:
-                # Check if all chunks are reasonable size
-                oversized = [c for c in ast_chunks if len(c.page_content) > chunk_size * 1.5]
-                
-                if not oversized:
-                    all_chunks.extend(ast_chunks)
-                    ast_success += 1
-                    continue
-                else:
-                    # Some chunks too large - use fallback
-                    logger.debug(f"{source}: {len(oversized)} AST chunks oversized, using fallback")
-                    ast_failed += 1
-            else:
+    split_one = partial(_split_one_document, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    
+    for source, chunks, imports, outcome in _split_results(documents, split_one):
+        if outcome == "ast":
+            ast_success += 1
+        else:
+            if outcome == "ast_failed":
                 ast_failed += 1
+            elif outcome == "trivial":
+                trivial_skipped += 1
+            fallback_used += 1
+            # Strategy 3: AST chunks carry their imports already
+            if imports:
+                chunks = [_enrich_one(chunk, imports) for chunk in chunks]
         
-        # Strategy 2: Language-aware fallback
-        fallback_used += 1
-        chunks = _language_aware_split([doc], chunk_size, chunk_overlap)
-        all_chunks.extend(chunks)
-    
-    # Strategy 3: Enrich all chunks with imports
-    all_chunks = _enrich_with_imports(all_chunks, import_map)
+        for chunk in chunks:
+            with_imports += bool(chunk.metadata.get('has_imports'))
+            yield chunk
     
     logger.info(f"   AST successful: {ast_success} files")
     logger.info(f"   AST failed/oversized: {ast_failed} files")
+    logger.info(f"   AST skipped (no definitions): {trivial_skipped} files")
     logger.info(f"   Fallback used: {fallback_used} files")
-    logger.info(f"   Chunks with imports: {sum(1 for c in all_chunks if c.metadata.get('has_imports'))}")
+    logger.info(f"   Chunks with imports: {with_imports}")
+
+
+def _split_pool_context():
+    """forkserver where available (POSIX), else spawn - fork is never used."""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _split_results(documents: List[Document], split_one) -> Iterator[Tuple[str, List[Document], str, str]]:
+    """
+    split_one over every document, in input order.
     
-    return all_chunks
+    Large inputs go through a process pool whose results are consumed as
+    they arrive; if the pool fails, the remaining documents are split
+    serially (nothing is split twice).
+    """
+    done = 0
+    total_bytes = sum(len(doc.page_content) for doc in documents)
+    if total_bytes >= PARALLEL_SPLIT_MIN_BYTES:
+        workers = min(PARALLEL_SPLIT_MAX_WORKERS, os.cpu_count() or 1)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_split_pool_context()) as executor:
+                for result in executor.map(split_one, documents, chunksize=SPLIT_MAP_CHUNKSIZE):
+                    yield result
+                    done += 1
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"⚠️ Parallel splitting unavailable ({e}), splitting serially")
+    
+    yield from map(split_one, documents[done:])
 
 
 def _ast_only_split(documents: List[Document], chunk_size: int) -> List[Document]:
@@ -347,6 +550,40 @@ def _ast_only_split(documents: List[Document], chunk_size: int) -> List[Document
 # UTILITIES
 # ============================================================================
 
+def _chunk_summary(chunks: List[Document]) -> Dict:
+    """
+    Sizes, counts and sources of non-empty chunks, in one pass.
+    
+    Returns:
+        Dict with total_chars, min_size, max_size, ast_chunks,
+        with_imports and sources
+    """
+    total_chars = 0
+    min_size = max_size = len(chunks[0].page_content)
+    ast_chunks = 0
+    with_imports = 0
+    sources = set()
+    for chunk in chunks:
+        metadata = chunk.metadata
+        size = len(chunk.page_content)
+        total_chars += size
+        if size < min_size:
+            min_size = size
+        elif size > max_size:
+            max_size = size
+        ast_chunks += metadata.get('chunk_type') == 'ast_node'
+        with_imports += bool(metadata.get('has_imports'))
+        sources.add(metadata.get('source', 'unknown'))
+    return {
+        'total_chars': total_chars,
+        'min_size': min_size,
+        'max_size': max_size,
+        'ast_chunks': ast_chunks,
+        'with_imports': with_imports,
+        'sources': sources,
+    }
+
+
 def _log_statistics(original_docs: List[Document], chunks: List[Document]) -> None:
     """Log detailed statistics."""
     logger.info("✅ Splitting complete!")
@@ -356,15 +593,14 @@ def _log_statistics(original_docs: List[Document], chunks: List[Document]) -> No
     if original_docs and chunks:
         logger.info(f"   Ratio: 1 doc → {len(chunks)/len(original_docs):.1f} chunks (avg)")
         
-        total_chars = sum(len(c.page_content) for c in chunks)
-        avg_size = total_chars // len(chunks)
-        min_size = min(len(c.page_content) for c in chunks)
-        max_size = max(len(c.page_content) for c in chunks)
-        
-        logger.info(f"   Chunk sizes: min={min_size}, avg={avg_size}, max={max_size} chars")
+        summary = _chunk_summary(chunks)
+        avg_size = summary['total_chars'] // len(chunks)
+        logger.info(
+            f"   Chunk sizes: min={summary['min_size']}, avg={avg_size}, max={summary['max_size']} chars"
+        )
         
         # Count chunk types
-        ast_chunks = sum(1 for c in chunks if c.metadata.get('chunk_type') == 'ast_node')
+        ast_chunks = summary['ast_chunks']
         if ast_chunks:
             logger.info(f"   AST-based chunks: {ast_chunks}")
 
@@ -379,22 +615,18 @@ def get_chunk_statistics(chunks: List[Document]) -> dict:
     if not chunks:
         return {}
     
-    sizes = [len(c.page_content) for c in chunks]
-    sources = set(c.metadata.get('source', 'unknown') for c in chunks)
-    
-    ast_chunks = sum(1 for c in chunks if c.metadata.get('chunk_type') == 'ast_node')
-    chunks_with_imports = sum(1 for c in chunks if c.metadata.get('has_imports'))
+    summary = _chunk_summary(chunks)
     
     return {
         'total_chunks': len(chunks),
-        'unique_sources': len(sources),
-        'ast_based_chunks': ast_chunks,
-        'chunks_with_imports': chunks_with_imports,
-        'total_characters': sum(sizes),
-        'avg_chunk_size': sum(sizes) / len(sizes),
-        'min_chunk_size': min(sizes),
-        'max_chunk_size': max(sizes),
-        'sources': sorted(list(sources))
+        'unique_sources': len(summary['sources']),
+        'ast_based_chunks': summary['ast_chunks'],
+        'chunks_with_imports': summary['with_imports'],
+        'total_characters': summary['total_chars'],
+        'avg_chunk_size': summary['total_chars'] / len(chunks),
+        'min_chunk_size': summary['min_size'],
+        'max_chunk_size': summary['max_size'],
+        'sources': sorted(summary['sources'])
     }
 
 
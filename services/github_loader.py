@@ -4,23 +4,42 @@ GitHubLoader – Production-grade loader for GitHub RAG Chatbot
 Features:
 - Fetches complete file tree (recursive)
 - Filters by extension and size
-- Downloads and decodes file content
+- Downloads file content as one tarball (per-file requests as fallback)
 - Creates metadata-only placeholders for binary files
 - Loads commit history for temporal context
-- Handles main/master branch fallback
+- Falls back to the repo's default branch
 - Rate limit detection and error handling
 """
 
+import asyncio
 import os
-import base64
+import sys
+import hashlib
 import logging
+import tarfile
 import time
 from typing import List, Tuple, Optional, Dict, Any, Callable
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 from langchain_core.documents import Document
 
+# With httpx + h2 installed, per-file downloads are multiplexed as HTTP/2
+# streams over one connection instead of a thread per request
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx needs it for http2=True
+except ImportError:
+    httpx = None
+
+# Large tree listings parse several times faster with orjson; stdlib otherwise
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 # Logging setup
 logger = logging.getLogger(__name__)
 if not logger.handlers:
@@ -33,6 +52,29 @@ if not logger.handlers:
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
 
+# Parallel file downloads; the connection pool is sized to match so every
+# worker reuses a keep-alive connection instead of a fresh TLS handshake
+DOWNLOAD_WORKERS = 32
+
+# Ask for file bytes rather than base64-wrapped JSON
+RAW_HEADERS = {"Accept": "application/vnd.github.raw"}
+
+# Ask the commits endpoint for just the SHA (a 40-byte body)
+SHA_HEADERS = {"Accept": "application/vnd.github.sha"}
+
+# ETags + bodies of conditional GETs: an unchanged tree comes back as a
+# body-less 304, which doesn't count against the API rate limit
+HTTP_CACHE_DIR = ".github_cache"
+
+
+def _in_event_loop() -> bool:
+    """True when called from inside a running asyncio loop (asyncio.run would fail)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
 
 class GitHubLoader:
     """Loads GitHub repository files and commits as LangChain Documents."""
@@ -49,18 +91,21 @@ class GitHubLoader:
         max_file_size_bytes: int = 1_048_576,  # 1 MiB
         github_api_url: str = "https://api.github.com",
         commit_history_limit: int = 50,
+        http_cache_dir: Optional[str] = HTTP_CACHE_DIR,
     ):
         """
         Initialize GitHub loader.
         
         Args:
             repo: Either 'owner/repo' or full URL
-            branch: Branch name (fallback to master if not found)
+            branch: Branch name (falls back to the repo's default branch if not found)
             access_token: GitHub Personal Access Token
             file_extensions: Extensions to fully load
             max_file_size_bytes: Skip files larger than this
             github_api_url: API base URL (for GitHub Enterprise)
             commit_history_limit: Number of recent commits to load
+            http_cache_dir: Where ETags/bodies for conditional GETs are kept
+                (None disables them)
         """
         # Normalize repo to owner/repo format
         if repo.startswith("http"):
@@ -72,31 +117,43 @@ class GitHubLoader:
         
         self.repo = repo
         self.branch = branch
+        self.commit: Optional[str] = None  # set by head_commit() / load()
         self.access_token = access_token
-        self.file_extensions = tuple(ext.lower() for ext in file_extensions)
+        self.file_extensions = frozenset(ext.lower() for ext in file_extensions)  # O(1) membership
         self.max_file_size = max_file_size_bytes
         self.github_api_url = github_api_url.rstrip("/")
         self.commit_history_limit = commit_history_limit
+        self.http_cache_dir = http_cache_dir
         
         # Setup headers
         self.headers: Dict[str, str] = {"Accept": "application/vnd.github.v3+json"}
         if access_token:
             self.headers["Authorization"] = f"token {access_token}"
+        
+        # Shared session: connections are pooled across all requests/threads
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
     
-    def _make_request_with_retry(self, url: str, max_retries: int = 3) -> requests.Response:
+    def _make_request_with_retry(
+        self, url: str, max_retries: int = 3, headers: Optional[Dict[str, str]] = None
+    ) -> requests.Response:
         """
         Make HTTP request with retry logic for connection errors
         
         Args:
             url: URL to request
             max_retries: Maximum number of retry attempts
+            headers: Extra headers for this request (merged over the session's)
             
         Returns:
             Response object
         """
         for attempt in range(max_retries):
             try:
-                resp = requests.get(url, headers=self.headers, timeout=60)
+                resp = self.session.get(url, headers=headers, timeout=60)
                 
                 # Check for rate limiting
                 if resp.status_code == 403 and "X-RateLimit-Remaining" in resp.headers:
@@ -137,54 +194,151 @@ class GitHubLoader:
         """
         logger.info("🚀 Starting ingestion for %s (branch=%s)", self.repo, self.branch)
         
-        # Step 1: Resolve branch (main -> master fallback)
-        branch = self._resolve_branch()
+        # Step 1: Resolve the commit (requested branch -> repo default
+        # fallback); reused if head_commit() already resolved it
+        commit = self._resolve_commit()
         
         # Step 2: Get file tree
-        tree_items = self._fetch_tree(branch)
+        tree_items = self._fetch_tree(commit)
         
-        # Step 3: Filter files to load
+        # Step 3: Filter files to load (methods bound to locals once - this
+        # loop runs for every entry of the tree)
         files_to_load = []
-        placeholders = []
+        skipped = []
+        should_load = self._should_load_file
+        load_file, skip_file = files_to_load.append, skipped.append
         
         for item in tree_items:
-            if item["type"] != "blob":
-                continue
-            
-            path = item["path"]
-            size = item.get("size", 0)
-            
-            if self._should_load_file(path, size):
-                files_to_load.append(item)
-            else:
-                # Binary/large file - create placeholder
-                placeholder = Document(
-                    page_content=f"[BINARY OR SKIPPED FILE] {os.path.basename(path)}",
-                    metadata=self._build_metadata(item, placeholder=True),
-                )
-                placeholders.append(placeholder)
+            if item["type"] == "blob":
+                (load_file if should_load(item["path"], item.get("size", 0)) else skip_file)(item)
+        
+        # Binary/large files - placeholders, built after filtering
+        build_metadata = self._build_metadata
+        basename = os.path.basename
+        placeholders = [
+            Document(
+                page_content=f"[BINARY OR SKIPPED FILE] {basename(item['path'])}",
+                metadata=build_metadata(item, placeholder=True),
+            )
+            for item in skipped
+        ]
         
         total_files = len(files_to_load)
         logger.info(f"📁 Found {total_files} files to process")
         
-        # Step 4: Load files in parallel
+        # Step 4: Load files - one tarball download, per-file requests as fallback.
+        # The archive is read from resp.raw, so a reset/timeout mid-stream
+        # surfaces as a urllib3 error or OSError rather than a requests error
+        try:
+            documents = self._load_from_tarball(commit, files_to_load, progress_callback)
+        except (
+            requests.RequestException, urllib3.exceptions.HTTPError, OSError,
+            tarfile.TarError, RuntimeError
+        ) as e:
+            logger.warning(f"⚠️ Tarball download failed ({e}), loading files individually")
+            documents = self._load_files_individually(files_to_load, progress_callback)
+        
+        # Add placeholders
+        documents.extend(placeholders)
+        
+        # Step 5: Optionally load commit history
+        if load_commits:
+            logger.info("📜 Loading commit history...")
+            documents.extend(self._load_commit_history())
+        else:
+            logger.info("⏭️  Skipping commit history (load_commits=False)")
+        
+        logger.info("✅ Ingestion complete – %d documents produced", len(documents))
+        return documents
+    
+    def _load_from_tarball(
+        self,
+        ref: str,
+        items: List[Dict[str, Any]],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Document]:
+        """
+        Extract the wanted tree items from a single tarball of ref (a commit SHA).
+        
+        One streamed download replaces one request per file; members not in
+        `items` are skipped without being decoded. Paths the archive leaves
+        out (export-ignore in .gitattributes - often tests/, docs/) are
+        downloaded individually afterwards.
+        """
+        wanted = {item["path"]: item for item in items}
+        total_files = len(wanted)
+        tarball_url = f"{self.github_api_url}/repos/{self.repo}/tarball/{ref}"
+        logger.info("📦 Downloading tarball for %s", self.repo)
+        
+        resp = self.session.get(tarball_url, stream=True, timeout=60)
+        if resp.status_code != 200:
+            self._handle_http_error(resp, "downloading repository tarball")
+        
+        # Undo any transfer-level gzip so tarfile only sees the archive itself
+        resp.raw.decode_content = True
+        documents: List[Document] = []
+        extracted = set()
+        with resp, tarfile.open(fileobj=resp.raw, mode="r|gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                # Members live under a "<owner>-<repo>-<sha>/" top-level directory
+                item = wanted.get(member.name.partition("/")[2])
+                if item is None:
+                    continue
+                
+                raw = tar.extractfile(member).read().decode("utf-8", errors="ignore")
+                documents.append(
+                    Document(page_content=raw, metadata=self._build_metadata(item, placeholder=False))
+                )
+                extracted.add(item["path"])
+                
+                if progress_callback:
+                    progress_callback(len(documents), total_files)
+                
+                # Everything wanted is in - don't download the rest of the archive
+                if len(documents) == total_files:
+                    break
+        
+        logger.info(f"📄 Extracted {len(documents)}/{total_files} files from tarball")
+        
+        missing = [wanted[path] for path in wanted.keys() - extracted]
+        if missing:
+            logger.info(f"📥 {len(missing)} files not in the tarball (export-ignore), downloading them")
+            done_before = len(documents)
+            documents.extend(self._load_files_individually(
+                missing,
+                (lambda current, _: progress_callback(done_before + current, total_files))
+                if progress_callback else None
+            ))
+        return documents
+    
+    def _load_files_individually(
+        self,
+        items: List[Dict[str, Any]],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Document]:
+        """Download files one request each, in parallel."""
+        if httpx is not None and not _in_event_loop():
+            return asyncio.run(self._aload_files(items, progress_callback))
+        
+        total_files = len(items)
         documents: List[Document] = []
         files_processed = 0
         
         def load_single_file(item):
             """Helper function to load a single file"""
+            # No per-file delay: rate limits are handled in _make_request_with_retry
             try:
-                doc = self._load_file_content(item)
-                time.sleep(0.01)  # Reduced from 0.1s to 0.01s
-                return doc
+                return self._load_file_content(item)
             except Exception as e:
                 logger.warning(f"Failed to load {item.get('path', 'unknown')}: {e}")
                 return None
         
         # Use ThreadPoolExecutor for parallel downloads
-        with ThreadPoolExecutor(max_workers=10) as executor:
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
             # Submit all file loading tasks
-            future_to_item = {executor.submit(load_single_file, item): item for item in files_to_load}
+            future_to_item = {executor.submit(load_single_file, item): item for item in items}
             
             # Process completed tasks as they finish
             for future in as_completed(future_to_item):
@@ -201,40 +355,162 @@ class GitHubLoader:
                     if files_processed % 10 == 0:
                         logger.info(f"📄 Processed {files_processed}/{total_files} files...")
         
-        # Add placeholders
-        documents.extend(placeholders)
+        return documents
+    
+    async def _aload_files(
+        self,
+        items: List[Dict[str, Any]],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Document]:
+        """
+        Download files concurrently over a single HTTP/2 connection.
         
-        # Step 5: Optionally load commit history
-        if load_commits:
-            logger.info("📜 Loading commit history...")
-            documents.extend(self._load_commit_history())
-        else:
-            logger.info("⏭️  Skipping commit history (load_commits=False)")
+        Files whose request fails are retried afterwards through the
+        synchronous path (_load_file_content), which has backoff/rate-limit
+        handling.
+        """
+        total_files = len(items)
+        documents: List[Document] = []
+        failed: List[Dict[str, Any]] = []
+        semaphore = asyncio.Semaphore(DOWNLOAD_WORKERS)
         
-        logger.info("✅ Ingestion complete – %d documents produced", len(documents))
+        async with httpx.AsyncClient(
+            http2=True,
+            headers={**self.headers, **RAW_HEADERS},
+            limits=httpx.Limits(max_connections=DOWNLOAD_WORKERS),
+            timeout=60,
+        ) as client:
+            
+            async def load_one(item):
+                async with semaphore:
+                    try:
+                        resp = await client.get(self._raw_url(item["path"]))
+                    except httpx.HTTPError as e:
+                        logger.warning(f"Failed to load {item['path']}: {e}")
+                        failed.append(item)
+                        return None
+                if resp.status_code != 200:
+                    failed.append(item)
+                    return None
+                return Document(
+                    page_content=resp.content.decode("utf-8", errors="ignore"),
+                    metadata=self._build_metadata(item, placeholder=False),
+                )
+            
+            for next_done in asyncio.as_completed([load_one(item) for item in items]):
+                doc = await next_done
+                if doc:
+                    documents.append(doc)
+                    if progress_callback:
+                        progress_callback(len(documents), total_files)
+        
+        for item in failed:
+            doc = self._load_file_content(item)
+            if doc:
+                documents.append(doc)
+        
+        logger.info(f"📄 Downloaded {len(documents)}/{total_files} files over HTTP/2")
         return documents
     
-    def _resolve_branch(self) -> str:
-        """Try requested branch, fallback to master."""
-        for candidate in (self.branch, "master"):
-            url = f"{self.github_api_url}/repos/{self.repo}/git/trees/{candidate}?recursive=1"
-            resp = self._make_request_with_retry(url)
-            if resp.status_code == 200:
-                logger.info("✅ Using branch '%s'", candidate)
-                return candidate
-            if resp.status_code == 404:
-                logger.warning("Branch '%s' not found – trying fallback", candidate)
-                continue
-            self._handle_http_error(resp, f"branch resolution ({candidate})")
-        raise RuntimeError(f"Unable to resolve branch for repo '{self.repo}'.")
+    def _conditional_get(self, url: str) -> requests.Response:
+        """
+        GET with If-None-Match, answering a 304 from the on-disk copy.
+        
+        The returned response always carries the full body: on 304 its
+        status and content are replaced by the cached 200 response.
+        """
+        if not self.http_cache_dir:
+            return self._make_request_with_retry(url)
+        
+        key = hashlib.sha256(url.encode()).hexdigest()
+        body_path = os.path.join(self.http_cache_dir, f"{key}.json")
+        etag_path = os.path.join(self.http_cache_dir, f"{key}.etag")
+        
+        headers = None
+        if os.path.exists(body_path) and os.path.exists(etag_path):
+            with open(etag_path, encoding="utf-8") as f:
+                headers = {"If-None-Match": f.read()}
+        
+        resp = self._make_request_with_retry(url, headers=headers)
+        
+        if resp.status_code == 304:
+            logger.info("♻️ Not modified, using cached response for %s", url)
+            with open(body_path, "rb") as f:
+                resp._content = f.read()
+            resp.status_code = 200
+        elif resp.status_code == 200 and resp.headers.get("ETag"):
+            try:
+                os.makedirs(self.http_cache_dir, exist_ok=True)
+                with open(body_path, "wb") as f:
+                    f.write(resp.content)
+                with open(etag_path, "w", encoding="utf-8") as f:
+                    f.write(resp.headers["ETag"])
+            except OSError as e:
+                logger.warning("Could not cache response for %s: %s", url, e)
+        
+        return resp
+    
+    def head_commit(self) -> Optional[str]:
+        """
+        SHA of the branch head (same default-branch fallback as loading).
+        
+        One tiny request, so callers can tell whether an existing index is
+        still current before downloading anything. The SHA is kept, so a
+        following load() fetches exactly this commit. None if it can't be found.
+        """
+        try:
+            return self._resolve_commit()
+        except (requests.RequestException, RuntimeError) as e:
+            logger.warning("Could not resolve head commit: %s", e)
+            return None
     
-    def _fetch_tree(self, branch: str) -> List[Dict[str, Any]]:
-        """Get complete file tree."""
-        tree_url = f"{self.github_api_url}/repos/{self.repo}/git/trees/{branch}?recursive=1"
-        resp = self._make_request_with_retry(tree_url)
+    def _branch_head(self, branch: str) -> requests.Response:
+        """Commit SHA of a branch as a 40-byte body (404/422 if it doesn't exist)."""
+        url = f"{self.github_api_url}/repos/{self.repo}/commits/{branch}"
+        return self._make_request_with_retry(url, headers=SHA_HEADERS)
+    
+    def _default_branch(self) -> str:
+        """The repository's default branch, from the (small, ETag-cached) repo info."""
+        resp = self._conditional_get(f"{self.github_api_url}/repos/{self.repo}")
+        if resp.status_code != 200:
+            self._handle_http_error(resp, "fetching repository info")
+        default_branch = json_loads(resp.content).get("default_branch")
+        if not default_branch:
+            raise RuntimeError(f"Unable to resolve branch for repo '{self.repo}'.")
+        return default_branch
+    
+    def _resolve_commit(self) -> str:
+        """
+        Pin the load to one commit: the head of the requested branch, or of
+        the repo's default branch if it doesn't exist.
+        
+        Tree, tarball and raw downloads all use this SHA instead of the
+        branch name, so a push during the load can't mix newer content into
+        an index keyed by the older SHA. The resolved branch is kept on the
+        loader for citations.
+        """
+        if self.commit:
+            return self.commit
+        
+        resp = self._branch_head(self.branch)
+        if resp.status_code in (404, 422):
+            logger.warning("Branch '%s' not found – using the default branch", self.branch)
+            self.branch = self._default_branch()
+            resp = self._branch_head(self.branch)
+        if resp.status_code != 200:
+            self._handle_http_error(resp, f"branch resolution ({self.branch})")
+        
+        self.commit = resp.text.strip()
+        logger.info("✅ Using branch '%s' at %s", self.branch, self.commit[:12])
+        return self.commit
+    
+    def _fetch_tree(self, ref: str) -> List[Dict[str, Any]]:
+        """Get complete file tree of ref (a commit SHA or branch)."""
+        tree_url = f"{self.github_api_url}/repos/{self.repo}/git/trees/{ref}?recursive=1"
+        resp = self._conditional_get(tree_url)
         if resp.status_code != 200:
             self._handle_http_error(resp, "fetching repository tree")
-        tree = resp.json().get("tree", [])
+        tree = json_loads(resp.content).get("tree", [])
         logger.info("📂 Retrieved %d items from repository tree", len(tree))
         return tree
     
@@ -252,22 +528,15 @@ class GitHubLoader:
         return True
     
     def _load_file_content(self, item: Dict[str, Any]) -> Optional[Document]:
-        """Download and decode a single file."""
+        """Download a single file as raw bytes (no Contents API / base64)."""
         path = item["path"]
-        content_url = (
-            f"{self.github_api_url}/repos/{self.repo}/contents/{path}?ref={self.branch}"
-        )
         try:
-            resp = self._make_request_with_retry(content_url)
+            resp = self._make_request_with_retry(self._raw_url(path), headers=RAW_HEADERS)
             if resp.status_code != 200:
                 logger.error("Failed to fetch %s – %s", path, resp.text)
                 return None
             
-            data = resp.json()
-            if data.get("encoding") == "base64":
-                raw = base64.b64decode(data["content"]).decode("utf-8", errors="ignore")
-            else:
-                raw = data.get("content", "")
+            raw = resp.content.decode("utf-8", errors="ignore")
             
             metadata = self._build_metadata(item, placeholder=False)
             return Document(page_content=raw, metadata=metadata)
@@ -275,10 +544,25 @@ class GitHubLoader:
             logger.error("Exception loading file %s: %s", path, str(e))
             return None
     
+    def _raw_url(self, path: str) -> str:
+        """
+        URL returning the file's bytes directly.
+        
+        github.com serves raw files from raw.githubusercontent.com, which
+        doesn't count against the API rate limit. Other hosts (Enterprise)
+        use the Contents API with the raw media type instead of base64 JSON.
+        """
+        ref = self.commit or self.branch
+        if self.github_api_url == "https://api.github.com":
+            return f"https://raw.githubusercontent.com/{self.repo}/{ref}/{path}"
+        return f"{self.github_api_url}/repos/{self.repo}/contents/{path}?ref={ref}"
+    
     def _build_metadata(self, item: Dict[str, Any], placeholder: bool) -> Dict[str, Any]:
         """Create metadata dictionary."""
         return {
-            "source": item["path"],
+            # Interned: every chunk of the file shares it, and the equality
+            # checks in dict/source lookups short-circuit on identity
+            "source": sys.intern(item["path"]),
             "repo": self.repo,
             "branch": self.branch,
             "sha": item.get("sha"),
@@ -299,7 +583,7 @@ class GitHubLoader:
                 logger.warning("Could not fetch commit history – %s", resp.text)
                 return []
             
-            commits = resp.json()
+            commits = json_loads(resp.content)
             docs: List[Document] = []
             for c in commits:
                 sha = c.get("sha")
@@ -2,6 +2,7 @@
 Language Detector - Identify programming languages
 Purpose: Route documents to appropriate processors
 """
+from collections import Counter
 from typing import Dict, Optional
 import os
 
@@ -73,6 +74,12 @@ class LanguageDetector:
         '.sql': 'sql',
     }
     
+    # Config/docs rather than code
+    NON_CODE_LANGUAGES = frozenset({'markdown', 'restructuredtext', 'json', 'yaml', 'toml', 'xml'})
+    
+    # Languages with AST support
+    AST_LANGUAGES = frozenset({'python', 'javascript', 'typescript', 'java', 'go', 'rust'})
+    
     @classmethod
     def detect(cls, file_path: str) -> Optional[str]:
         """
@@ -91,8 +98,7 @@ class LanguageDetector:
     def is_code(cls, file_path: str) -> bool:
         """Check if file is code (not config/doc)"""
         language = cls.detect(file_path)
-        non_code = {'markdown', 'restructuredtext', 'json', 'yaml', 'toml', 'xml'}
-        return language is not None and language not in non_code
+        return language is not None and language not in cls.NON_CODE_LANGUAGES
     
     @classmethod
     def get_processor_type(cls, file_path: str) -> str:
@@ -104,10 +110,7 @@ class LanguageDetector:
         """
         language = cls.detect(file_path)
         
-        # Languages with AST support
-        ast_languages = {'python', 'javascript', 'typescript', 'java', 'go', 'rust'}
-        
-        if language in ast_languages:
+        if language in cls.AST_LANGUAGES:
             return 'ast'
         elif language:
             return 'regex'
@@ -130,14 +133,13 @@ class LanguageDetector:
             >>> LanguageDetector.analyze_repository(files)
             {'python': 2, 'javascript': 1, 'markdown': 1}
         """
-        language_counts = {}
-        
-        for path in file_paths:
-            lang = cls.detect(path)
-            if lang:
-                language_counts[lang] = language_counts.get(lang, 0) + 1
+        # Locals instead of attribute lookups inside the loop
+        get = cls.LANGUAGE_MAP.get
+        splitext = os.path.splitext
         
-        return language_counts
+        language_counts = Counter(get(splitext(path)[1].lower()) for path in file_paths)
+        language_counts.pop(None, None)
+        return dict(language_counts)
     
     @classmethod
     def get_dominant_language(cls, file_paths: list) -> Optional[str]:
@@ -180,7 +182,9 @@ class LanguageDetector:
             >>> LanguageDetector.filter_by_language(files, 'python')
             ['app.py', 'utils.py']
         """
-        return [path for path in file_paths if cls.detect(path) == language]
+        get = cls.LANGUAGE_MAP.get
+        splitext = os.path.splitext
+        return [path for path in file_paths if get(splitext(path)[1].lower()) == language]
     
     @classmethod
     def get_code_files_only(cls, file_paths: list) -> list:
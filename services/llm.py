@@ -3,13 +3,80 @@ LLM Service - Groq API Integration
 Learn: How to use LLMs for generating answers from code context
 """
 from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
-from typing import List, Dict
+from langchain_core.prompts import ChatPromptTemplate
+from typing import List, Dict, Iterator, Optional, Union, TYPE_CHECKING
+import asyncio
+import hashlib
+import httpx
 import logging
 import os
+import threading
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+    from services.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Process-wide client: built once, so its HTTP connection to Groq stays alive
+# across questions instead of a new client (and TLS handshake) per call
+_LLM = None
+_CHAIN = None
+_LLM_LOCK = threading.Lock()
+_HTTP_CLIENT = None
+
+# Bounded Groq latency: fail fast on connect, cap the whole request, and
+# retry at most twice instead of relying on library defaults
+LLM_TIMEOUT = 30.0
+LLM_CONNECT_TIMEOUT = 5.0
+LLM_MAX_RETRIES = 2
+
+# Keep-alive pool shared by every ChatGroq instance
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_KEEPALIVE = 10
+
+# Parsed once at import instead of on every generate_answer call
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a senior software engineer helping developers understand code.
+
+RULES:
+1. Answer ONLY using the provided code context
+2. If the answer isn't in the context, say "I don't have enough information"
+3. Cite specific files and function names when possible
+4. Use code snippets in your explanation
+5. Be concise but thorough
+
+Context:
+{context}"""),
+    ("human", "{question}")
+])
+
+
+def groq_client_kwargs() -> Dict:
+    """
+    Timeout / retry / connection-pool settings for ChatGroq(**...)
+    
+    Every ChatGroq built with these shares one httpx.Client, so repeat
+    questions reuse open TCP+TLS connections to api.groq.com.
+    """
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None:
+        with _LLM_LOCK:
+            if _HTTP_CLIENT is None:
+                _HTTP_CLIENT = httpx.Client(
+                    limits=httpx.Limits(
+                        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                        max_connections=LLM_MAX_CONNECTIONS
+                    ),
+                    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+                )
+    
+    return {
+        "timeout": LLM_TIMEOUT,
+        "max_retries": LLM_MAX_RETRIES,
+        "http_client": _HTTP_CLIENT,
+    }
+
 
 def get_llm():
     """
@@ -20,24 +87,73 @@ def get_llm():
     - Free tier available
     - Llama 3.1 quality
     
+    The client is created on first call and reused afterwards.
+    
     Returns:
         ChatGroq instance
     """
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise ValueError("❌ GROQ_API_KEY not found. Set it in .env file!")
+    global _LLM
+    if _LLM is not None:
+        return _LLM
     
-    llm = ChatGroq(
-        temperature=0,  # 0 = factual, 1 = creative
-        model_name="llama-3.1-70b-versatile",
-        groq_api_key=api_key
-    )
+    client_kwargs = groq_client_kwargs()
+    with _LLM_LOCK:
+        if _LLM is not None:
+            return _LLM
+        
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("❌ GROQ_API_KEY not found. Set it in .env file!")
+        
+        _LLM = ChatGroq(
+            temperature=0,  # 0 = factual, 1 = creative
+            model_name="llama-3.1-70b-versatile",
+            groq_api_key=api_key,
+            **client_kwargs
+        )
+        
+        logger.info("🤖 LLM initialized (Llama 3.1)")
+    return _LLM
+
+
+def get_chain():
+    """Prompt | LLM pipeline, composed once and reused."""
+    global _CHAIN
+    if _CHAIN is None:
+        _CHAIN = _PROMPT | get_llm()
+    return _CHAIN
+
+
+def answer_cache_for(vectorstore: "Chroma") -> "SemanticCache":
+    """
+    Semantic cache for the answers generated here.
+    
+    Entries are {"answer", "context_hash"}, so they live in their own
+    collection - the app's chat cache stores answers with citations.
+    """
+    from services.semantic_cache import ANSWER_CACHE_SUFFIX, SemanticCache
+    
+    return SemanticCache.for_vectorstore(vectorstore, suffix=ANSWER_CACHE_SUFFIX)
+
+
+def _cache_lookup(query: str, context: str, cache: "SemanticCache"):
+    """
+    (cached answer or None, query embedding, context hash)
+    
+    The context is fingerprinted, so an answer is never reused against
+    different code.
+    """
+    from services.embeddings import get_embeddings_model
     
-    logger.info("🤖 LLM initialized (Llama 3.1)")
-    return llm
+    query_embedding = get_embeddings_model().embed_query(query)
+    context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+    cached = cache.lookup(query_embedding)
+    if cached and cached.get("context_hash") == context_hash:
+        return cached["answer"], query_embedding, context_hash
+    return None, query_embedding, context_hash
 
 
-def generate_answer(query: str, context: str) -> str:
+def generate_answer(query: str, context: str, cache: Optional["SemanticCache"] = None) -> str:
     """
     Generate answer using RAG
     
@@ -46,74 +162,161 @@ def generate_answer(query: str, context: str) -> str:
     - Can't make up functionality
     - Cites specific files
     
+    LEARN: With a semantic cache, a paraphrase of an earlier question is
+    answered without calling the LLM - as long as the same context was
+    retrieved for it.
+    
     Args:
         query: User's question
         context: Retrieved code (formatted)
+        cache: Optional SemanticCache from answer_cache_for
     
     Returns:
         AI-generated answer
     """
-    logger.info(f"🤖 Generating answer for: '{query}'")
-    
-    # Create prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a senior software engineer helping developers understand code.
+    return "".join(stream_answer(query, context, cache=cache))
 
-RULES:
-1. Answer ONLY using the provided code context
-2. If the answer isn't in the context, say "I don't have enough information"
-3. Cite specific files and function names when possible
-4. Use code snippets in your explanation
-5. Be concise but thorough
 
-Context:
-{context}"""),
-        ("human", "{question}")
-    ])
+def stream_answer(query: str, context: str, cache: Optional["SemanticCache"] = None) -> Iterator[str]:
+    """
+    Generate answer using RAG, yielding text as the LLM produces it
+    
+    LEARN: Streaming doesn't make generation faster, but the first words
+    show up after ~100ms instead of after the whole answer is done.
+    Feed the generator to st.write_stream to render it incrementally.
+    
+    Args:
+        query: User's question
+        context: Retrieved code (formatted)
+        cache: Optional SemanticCache from answer_cache_for; a hit is yielded as a single chunk
     
-    # Create chain
-    llm = get_llm()
-    chain = prompt | llm
+    Yields:
+        Answer text chunks
+    """
+    if cache is not None:
+        cached, query_embedding, context_hash = _cache_lookup(query, context, cache)
+        if cached is not None:
+            yield cached
+            return
+    
+    logger.info(f"🤖 Generating answer for: '{query}'")
     
-    # Generate
-    response = chain.invoke({
+    # Prompt | LLM chain (built once per process)
+    chain = get_chain()
+    
+    # Generate, passing each chunk on as soon as it arrives
+    parts = []
+    for chunk in chain.stream({
         "context": context,
         "question": query
-    })
+    }):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
     
-    answer = response.content
+    answer = "".join(parts)
     logger.info(f"✅ Generated {len(answer)} character answer")
     
-    return answer
+    if cache is not None:
+        cache.store(query_embedding, {"answer": answer, "context_hash": context_hash})
 
 
 def generate_answer_with_citations(
     query: str,
     context: str,
-    citations: List[Dict]
+    citations: List[Dict],
+    cache: Optional["SemanticCache"] = None,
+    stream: bool = False
 ) -> Dict:
     """
     Generate answer + return with source citations
     
+    With stream=True, 'answer' is a generator of text chunks (see
+    stream_answer) for st.write_stream, which also returns the full text.
+    
     Returns:
         {
-            'answer': str,
+            'answer': str (or Iterator[str] when streaming),
             'sources': [...]
         }
     """
-    answer = generate_answer(query, context)
+    answer: Union[str, Iterator[str]]
+    if stream:
+        answer = stream_answer(query, context, cache=cache)
+    else:
+        answer = generate_answer(query, context, cache=cache)
     
-    # Format citations
-    formatted_sources = []
-    for cite in citations:
-        formatted_sources.append({
+    return {
+        'answer': answer,
+        'sources': format_sources(citations)
+    }
+
+
+def format_sources(citations: List[Dict]) -> List[Dict]:
+    """Citation dicts in the shape returned under 'sources'"""
+    return [
+        {
             'file': cite['file'],
             'function': cite.get('node_name', 'N/A'),
             'url': cite['url'],
             'lines': cite.get('lines', 'N/A')
-        })
+        }
+        for cite in citations
+    ]
+
+
+async def agenerate_answer(query: str, context: str, cache: Optional["SemanticCache"] = None) -> str:
+    """
+    Async generate_answer: awaits the Groq call (chain.ainvoke) instead of
+    blocking, so other work can run while the answer is generated.
+    """
+    if cache is not None:
+        # Embedding the query is CPU work - keep it off the event loop
+        cached, query_embedding, context_hash = await asyncio.to_thread(
+            _cache_lookup, query, context, cache
+        )
+        if cached is not None:
+            return cached
+    
+    logger.info(f"🤖 Generating answer for: '{query}'")
+    
+    response = await get_chain().ainvoke({
+        "context": context,
+        "question": query
+    })
+    
+    answer = response.content
+    logger.info(f"✅ Generated {len(answer)} character answer")
+    
+    if cache is not None:
+        await asyncio.to_thread(
+            cache.store, query_embedding, {"answer": answer, "context_hash": context_hash}
+        )
+    
+    return answer
+
+
+async def agenerate_answer_with_citations(
+    query: str,
+    context: str,
+    citations: List[Dict],
+    cache: Optional["SemanticCache"] = None
+) -> Dict:
+    """
+    Async generate_answer_with_citations
+    
+    LEARN: The LLM request is started first and the citations are formatted
+    while it is in flight, so their cost is hidden behind the network wait.
+    
+    Returns:
+        Same dict as generate_answer_with_citations
+    """
+    task = asyncio.create_task(agenerate_answer(query, context, cache=cache))
+    # Yield once so the task actually sends its request before we do CPU work
+    await asyncio.sleep(0)
+    sources = format_sources(citations)
     
     return {
-        'answer': answer,
-        'sources': formatted_sources
+        'answer': await task,
+        'sources': sources
     }
@@ -4,9 +4,32 @@ Jupyter Notebook Parser for RAG System
 Extracts code and markdown cells from .ipynb files, ignoring outputs and metadata.
 """
 
-import json
+import io
 from typing import Dict, List
 
+# Notebooks can be megabytes of JSON (embedded outputs); orjson parses them
+# several times faster, stdlib json otherwise
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# ijson is optional: big notebooks are stream-parsed (picks the C yajl2
+# backend when available), so cell outputs are never built as objects
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Below this size a full parse is faster than streaming
+NOTEBOOK_STREAM_MIN_CHARS = 100_000
+
+# Output template per extracted cell type
+CELL_TEMPLATES = {
+    "markdown": "# Markdown Cell\n{}\n",
+    "code": "# Code Cell\n```python\n{}\n```\n",
+}
+
 
 def parse_notebook(content: str) -> str:
     """
@@ -18,34 +41,64 @@ def parse_notebook(content: str) -> str:
     Returns:
         Cleaned text with code and markdown cells
     """
+    if ijson is not None and len(content) >= NOTEBOOK_STREAM_MIN_CHARS:
+        try:
+            return _parse_notebook_stream(content)
+        except ijson.JSONError:
+            return content
+    
     try:
-        notebook = json.loads(content)
+        notebook = json_loads(content)
         cells = notebook.get("cells", [])
         
         extracted_content = []
         
         for cell in cells:
-            cell_type = cell.get("cell_type", "")
-            source = cell.get("source", [])
+            template = CELL_TEMPLATES.get(cell.get("cell_type", ""))
+            if template is None:
+                continue
             
             # Join source lines (can be list or string)
-            if isinstance(source, list):
-                cell_content = "".join(source)
-            else:
-                cell_content = source
-            
-            if cell_type == "markdown":
-                extracted_content.append(f"# Markdown Cell\n{cell_content}\n")
-            elif cell_type == "code":
-                extracted_content.append(f"# Code Cell\n```python\n{cell_content}\n```\n")
+            source = cell.get("source", [])
+            cell_content = "".join(source) if isinstance(source, list) else source
+            extracted_content.append(template.format(cell_content))
         
         return "\n".join(extracted_content)
     
-    except (json.JSONDecodeError, KeyError) as e:
-        # If parsing fails, return original content
+    except (ValueError, KeyError, AttributeError) as e:
+        # If parsing fails (JSONDecodeError is a ValueError), return original content
         return content
 
 
+def _parse_notebook_stream(content: str) -> str:
+    """
+    parse_notebook for large notebooks, using ijson parse events.
+    
+    Only cells[*].cell_type and cells[*].source are kept; everything else
+    (outputs, base64 images, metadata) is tokenized and dropped.
+    """
+    extracted_content = []
+    cell_type = None
+    source = []
+    
+    for prefix, event, value in ijson.parse(io.BytesIO(content.encode("utf-8"))):
+        if prefix == "cells.item":
+            if event == "start_map":
+                cell_type = None
+                source = []
+            elif event == "end_map":
+                template = CELL_TEMPLATES.get(cell_type)
+                if template is not None:
+                    extracted_content.append(template.format("".join(source)))
+        elif prefix == "cells.item.cell_type":
+            cell_type = value
+        elif event == "string" and prefix in ("cells.item.source", "cells.item.source.item"):
+            # Source is either one string or a list of lines
+            source.append(value)
+    
+    return "\n".join(extracted_content)
+
+
 def is_notebook_file(filename: str) -> bool:
     """Check if a file is a Jupyter notebook."""
     return filename.lower().endswith(".ipynb")
@@ -2,19 +2,170 @@
 Retrieval Service - Smart Code Search
 Learn: How to find relevant code using semantic similarity
 """
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 from langchain_core.documents import Document
-from langchain_community.vectorstores import Chroma
+import numpy as np
 import logging
 
+# Numba is optional: JIT-compiled scoring if installed, NumPy otherwise
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Chroma is only needed for type hints - importing langchain_community is slow
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+
 logger = logging.getLogger(__name__)
 
+# Chroma where-clause excluding commit-history chunks, applied inside the
+# index search so no slots are spent on results that get thrown away
+CODE_ONLY_FILTER = {"source": {"$ne": "git_history"}}
+
+# Wider second search when git-history chunks crowded out code results
+# (in-memory EmbeddingMatrix search only - it has no where-clause)
+GIT_HISTORY_OVERFETCH = 3
+
+# Queries per embedding pass / Chroma query in retrieve_context_batch
+MAX_QUERY_BATCH_SIZE = 64
+
+# Rows upcast per step when NumPy scores an int8 matrix: the float32
+# temporary stays cache-sized instead of a full copy of the matrix per query
+DEQUANT_BLOCK_ROWS = 1024
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _cosine_scores(query, matrix):
+        n = matrix.shape[0]
+        scores = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            acc = np.float32(0.0)
+            for j in range(matrix.shape[1]):
+                acc += query[j] * matrix[i, j]
+            scores[i] = acc
+        return scores
+else:
+    def _cosine_scores(query, matrix):
+        if matrix.dtype != np.int8:
+            return matrix @ query
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), DEQUANT_BLOCK_ROWS):
+            block = matrix[start:start + DEQUANT_BLOCK_ROWS]
+            np.matmul(block.astype(np.float32), query, out=scores[start:start + len(block)])
+        return scores
+
+
+def top_k_cosine(query: np.ndarray, matrix: np.ndarray, k: int) -> np.ndarray:
+    """
+    LEARN: Exact top-k search over an in-memory embedding matrix
+    
+    Vectors must be L2-normalized, so cosine similarity == dot product.
+    Rows are scored in parallel (Numba) or with one BLAS call (NumPy).
+    
+    Args:
+        query: float32[dim] query vector
+        matrix: float32[n, dim] chunk vectors (or int8, uniformly scaled)
+        k: Number of results
+    
+    Returns:
+        Row indices of the k best matches, best first
+    """
+    scores = _cosine_scores(query, matrix)
+    if k < len(scores):
+        top = np.argpartition(-scores, k)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+
+def warmup_scoring(dim: int = 384) -> None:
+    """Trigger JIT compilation up front so the first real query doesn't pay for it."""
+    query = np.zeros(dim, dtype=np.float32)
+    # Numba compiles one specialization per matrix dtype (float32 and int8)
+    for dtype in (np.float32, np.int8):
+        top_k_cosine(query, np.zeros((1, dim), dtype=dtype), 1)
+
+
+class EmbeddingMatrix:
+    """
+    LEARN: All chunk embeddings as one contiguous float32 matrix
+    
+    Built once at ingestion (rows L2-normalized), so scoring a query is a
+    single matrix-vector product instead of a database round-trip per row.
+    Row i belongs to the Chroma id ids[i].
+    
+    With quantize=True (default) rows are stored as int8 (value * 127):
+    4x less memory, and 4x less memory traffic for the scoring pass, at a
+    negligible recall cost. Every row shares the scale 1/127 because rows
+    are unit length, so the ranking needs no dequantization at all.
+    Numba scores int8 rows directly; the NumPy fallback upcasts them in
+    DEQUANT_BLOCK_ROWS-sized blocks, never the whole matrix at once.
+    """
+    
+    INT8_SCALE = 127
+    
+    def __init__(self, quantize: bool = True):
+        self.quantize = quantize
+        self.ids: List[str] = []
+        self._blocks: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+    
+    def add_batch(self, ids: List[str], vectors: List[List[float]]) -> None:
+        """Append one ingestion batch (normalized, optionally quantized)."""
+        block = np.asarray(vectors, dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True) + 1e-12
+        if self.quantize:
+            block = np.round(block * self.INT8_SCALE).astype(np.int8)
+        self.ids.extend(ids)
+        self._blocks.append(block)
+        self._matrix = None
+    
+    @property
+    def matrix(self) -> np.ndarray:
+        """The stacked (n, dim) float32 or int8 matrix, concatenated once on first use."""
+        if self._matrix is None:
+            self._matrix = np.vstack(self._blocks)
+            self._blocks = [self._matrix]
+        return self._matrix
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def search(self, query_embedding: List[float], k: int) -> List[str]:
+        """Ids of the k most similar chunks, best first."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-12)
+        return [self.ids[i] for i in top_k_cosine(query, self.matrix, k)]
+
+
+def _search_embedding_matrix(
+    query_embedding: List[float],
+    vectorstore: "Chroma",
+    embedding_matrix: EmbeddingMatrix,
+    k: int
+) -> List[Document]:
+    """Exact in-memory search, then one Chroma lookup for the winning chunks."""
+    ids = embedding_matrix.search(query_embedding, k)
+    found = vectorstore.get(ids=ids, include=["documents", "metadatas"])
+    
+    # Chroma doesn't preserve the requested order - restore ranking
+    by_id = {
+        doc_id: Document(id=doc_id, page_content=text, metadata=metadata or {})
+        for doc_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+    }
+    return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+
 
 def retrieve_context(
     query: str,
-    vectorstore: Chroma,
-    k: int = 5,
-    filter_git_history: bool = True
+    vectorstore: "Chroma",
+    k: int = 3,
+    filter_git_history: bool = True,
+    embedding_matrix: Optional[EmbeddingMatrix] = None,
+    query_embedding: Optional[List[float]] = None
 ) -> List[Document]:
     """
     LEARN: Semantic search (meaning-based, not keyword matching)
@@ -26,25 +177,45 @@ def retrieve_context(
     How it works:
     1. Convert query → embedding vector
     2. Find k closest vectors in database (cosine similarity)
-    3. Filter out git history if asking about code
+    3. Skip git history if asking about code (filtered inside the search)
     4. Return the corresponding code chunks
     
     Args:
         query: User's question
         vectorstore: The ChromaDB instance
-        k: Number of results to return
+        k: Number of results to return (small by default - callers widen
+            it when the LLM asks for more context)
         filter_git_history: Whether to exclude git history from results
+        embedding_matrix: In-memory vectors from ingestion; when given, scoring
+            is one matrix-vector product instead of a Chroma index query
+        query_embedding: Precomputed embedding of query (e.g. already used
+            for the semantic cache), so the model isn't run twice
     
     Returns:
         List of relevant code chunks
     """
     logger.info(f"🔍 Searching for: '{query}'")
     
-    # Fetch more results to account for filtering
-    fetch_k = k * 3 if filter_git_history else k
+    # Semantic similarity search (embed the query once, unless done by the caller)
+    if query_embedding is None:
+        query_embedding = vectorstore.embeddings.embed_query(query)
+    
+    if embedding_matrix is None or not len(embedding_matrix):
+        # Chroma applies the git history filter during the search itself
+        results = vectorstore.similarity_search_by_vector(
+            query_embedding,
+            k=k,
+            filter=CODE_ONLY_FILTER if filter_git_history else None
+        )
+        logger.info(f"✅ Found {len(results)} relevant chunks")
+        return results
     
-    # Semantic similarity search
-    results = vectorstore.similarity_search(query, k=fetch_k)
+    def search(fetch_k: int) -> List[Document]:
+        return _search_embedding_matrix(query_embedding, vectorstore, embedding_matrix, fetch_k)
+    
+    # Fetch exactly k first; most repos are indexed without commit history,
+    # so the filter rarely removes anything
+    results = search(k)
     
     # Filter out git history if requested
     if filter_git_history:
@@ -52,6 +223,13 @@ def retrieve_context(
             doc for doc in results 
             if doc.metadata.get('source', '') != 'git_history'
         ]
+        if len(code_results) < k and len(results) == k:
+            # History chunks took some slots - search wider, once
+            results = search(k * GIT_HISTORY_OVERFETCH)
+            code_results = [
+                doc for doc in results
+                if doc.metadata.get('source', '') != 'git_history'
+            ]
         # Take top k after filtering
         results = code_results[:k]
     
@@ -60,6 +238,89 @@ def retrieve_context(
     return results
 
 
+def retrieve_context_batch(
+    queries: List[str],
+    vectorstore: "Chroma",
+    k: int = 3,
+    filter_git_history: bool = True,
+    batch_size: int = MAX_QUERY_BATCH_SIZE
+) -> List[List[Document]]:
+    """
+    LEARN: Many queries, one model call and one index query per batch
+    
+    retrieve_context embeds and searches one query at a time. For N
+    questions (e.g. prefetching follow-ups), embedding them together is a
+    single batched forward pass, and Chroma's collection.query() searches
+    all of them in one call.
+    
+    Args:
+        queries: Questions to search for
+        vectorstore: The ChromaDB instance
+        k: Results per query
+        filter_git_history: Whether to exclude git history from results
+        batch_size: Queries per embedding/index call
+    
+    Returns:
+        One list of relevant chunks per query, in query order
+    """
+    if not queries:
+        return []
+    
+    logger.info(f"🔍 Searching for {len(queries)} queries")
+    
+    collection = vectorstore._collection
+    all_results = []
+    
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        query_embeddings = vectorstore.embeddings.embed_documents(batch)
+        found = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k,
+            where=CODE_ONLY_FILTER if filter_git_history else None,
+            include=["documents", "metadatas"]
+        )
+        
+        for ids, texts, metadatas in zip(found["ids"], found["documents"], found["metadatas"]):
+            all_results.append([
+                Document(id=doc_id, page_content=text, metadata=metadata or {})
+                for doc_id, text, metadata in zip(ids, texts, metadatas)
+            ])
+    
+    logger.info(f"✅ Found {sum(map(len, all_results))} relevant chunks")
+    
+    return all_results
+
+
+# One Code Reference block per retrieved chunk (node_part is "" or " - Function/Class: <name>")
+CHUNK_TEMPLATE = "## Code Reference {i}{node_part}\nFile: {source}\n\n```python\n{content}\n```\n"
+
+
+def _format_chunk(i: int, doc: Document) -> str:
+    """Format one retrieved chunk as a numbered Code Reference block."""
+    metadata = doc.metadata
+    node_name = metadata.get('node_name')
+    return CHUNK_TEMPLATE.format(
+        i=i,
+        node_part=f" - Function/Class: {node_name}" if node_name else "",
+        source=metadata.get('source', 'unknown'),
+        content=doc.page_content
+    )
+
+
+def _citation(metadata: Dict) -> Dict:
+    """Citation dict for one chunk's metadata."""
+    start_line = metadata.get('start_line')
+    end_line = metadata.get('end_line')
+    return {
+        'file': metadata.get('source', 'unknown'),
+        'url': metadata.get('url', ''),
+        'node_name': metadata.get('node_name', ''),
+        # Git history and files without line info have no range
+        'lines': f"{start_line}-{end_line}" if start_line and end_line else "N/A"
+    }
+
+
 def format_context_for_llm(results: List[Document]) -> str:
     """
     LEARN: Format retrieved code for LLM consumption
@@ -69,21 +330,13 @@ def format_context_for_llm(results: List[Document]) -> str:
     - Need to know which file each code came from
     - Better formatting = better answers
     """
-    context_parts = []
+    # Fast paths: nothing to format / a single block needs no joining
+    if not results:
+        return ""
+    if len(results) == 1:
+        return _format_chunk(1, results[0])
     
-    for i, doc in enumerate(results, 1):
-        source = doc.metadata.get('source', 'unknown')
-        node_name = doc.metadata.get('node_name', '')
-        
-        # Format each chunk
-        header = f"## Code Reference {i}"
-        if node_name:
-            header += f" - Function/Class: {node_name}"
-        header += f"\nFile: {source}\n"
-        
-        context_parts.append(f"{header}\n```python\n{doc.page_content}\n```\n")
-    
-    return "\n".join(context_parts)
+    return "\n".join([_format_chunk(i, doc) for i, doc in enumerate(results, 1)])
 
 
 def get_citations(results: List[Document]) -> List[Dict]:
@@ -95,24 +348,40 @@ def get_citations(results: List[Document]) -> List[Dict]:
     - Clickable links to GitHub
     - Builds trust
     """
+    return [_citation(doc.metadata) for doc in results]
+
+
+def format_context_and_citations(results: List[Document]) -> Tuple[str, List[Dict]]:
+    """
+    LLM context and citations in one pass over the results
+    
+    Same output as (format_context_for_llm(results), get_citations(results)),
+    without walking the documents twice.
+    """
+    blocks = []
     citations = []
+    for i, doc in enumerate(results, 1):
+        blocks.append(_format_chunk(i, doc))
+        citations.append(_citation(doc.metadata))
+    return "\n".join(blocks), citations
+
+
+def build_llm_payload(
+    query: str,
+    vectorstore: "Chroma",
+    k: int = 3,
+    **retrieve_kwargs
+) -> Tuple[str, List[Dict]]:
+    """
+    Retrieve and format in one call
     
-    for doc in results:
-        start_line = doc.metadata.get('start_line')
-        end_line = doc.metadata.get('end_line')
-        
-        # Format line numbers properly
-        if start_line and end_line:
-            lines = f"{start_line}-{end_line}"
-        else:
-            lines = "N/A"  # For git history or files without line info
-        
-        citation = {
-            'file': doc.metadata.get('source', 'unknown'),
-            'url': doc.metadata.get('url', ''),
-            'node_name': doc.metadata.get('node_name', ''),
-            'lines': lines
-        }
-        citations.append(citation)
-    
-    return citations
+    Args:
+        query: User's question
+        vectorstore: The ChromaDB instance
+        k: Number of chunks to retrieve
+        **retrieve_kwargs: Passed on to retrieve_context
+    
+    Returns:
+        (context, citations), ready for generate_answer_with_citations
+    """
+    return format_context_and_citations(retrieve_context(query, vectorstore, k=k, **retrieve_kwargs))
@@ -0,0 +1,142 @@
+"""
+Semantic Cache - Reuse answers for near-duplicate questions
+Learn: How to skip the LLM when a question was (almost) already asked
+"""
+from typing import Dict, List, Optional, TYPE_CHECKING
+import json
+import logging
+import time
+import uuid
+
+# Chroma is only needed for type hints - importing langchain_community is slow
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity above which two questions count as "the same"
+SIMILARITY_THRESHOLD = 0.95
+
+# Cached answers older than this are ignored (seconds)
+CACHE_TTL_SECONDS = 3600
+
+# Least-recently-used answers are evicted beyond this many entries
+CACHE_MAX_ENTRIES = 512
+
+# Collection suffix per entry shape, so one writer never reads the other's
+# entries: the app caches {"answer", "citations"}, services.llm caches
+# {"answer", "context_hash"}
+QA_CACHE_SUFFIX = "_qa_cache"
+ANSWER_CACHE_SUFFIX = "_lm_cache"
+CACHE_SUFFIXES = (QA_CACHE_SUFFIX, ANSWER_CACHE_SUFFIX)
+
+
+class SemanticCache:
+    """
+    Q/A cache keyed by question embedding.
+    
+    LEARN: Exact-match caches miss "what does X do" vs "explain X".
+    Comparing question embeddings catches both, and the lookup costs
+    milliseconds instead of a multi-second LLM call.
+    """
+    
+    def __init__(
+        self,
+        collection,
+        threshold: float = SIMILARITY_THRESHOLD,
+        ttl_seconds: int = CACHE_TTL_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES
+    ):
+        """
+        Args:
+            collection: Chroma collection created with cosine distance
+            threshold: Minimum cosine similarity for a cache hit
+            ttl_seconds: Maximum age of a cached answer
+            max_entries: LRU cap on the number of cached answers
+        """
+        self.collection = collection
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+    
+    @classmethod
+    def for_vectorstore(
+        cls,
+        vectorstore: "Chroma",
+        suffix: str = QA_CACHE_SUFFIX,
+        **kwargs
+    ) -> "SemanticCache":
+        """
+        Create a cache living next to a repo's vector store.
+        
+        The cache collection is named after the repo's collection, so
+        answers never leak across repositories - even on a shared server.
+        suffix (one of CACHE_SUFFIXES) keeps differently shaped entries
+        in separate collections.
+        """
+        collection = vectorstore._client.get_or_create_collection(
+            name=f"{vectorstore._collection.name[:63 - len(suffix)]}{suffix}",
+            metadata={"hnsw:space": "cosine"}
+        )
+        return cls(collection, **kwargs)
+    
+    def lookup(self, query_embedding: List[float]) -> Optional[Dict]:
+        """Return the cached result for a similar question, or None."""
+        try:
+            if self.collection.count() == 0:
+                return None
+            
+            hit = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=1,
+                include=["metadatas", "distances"]
+            )
+            if not hit["ids"][0]:
+                return None
+            
+            # Cosine distance = 1 - cosine similarity
+            similarity = 1 - hit["distances"][0][0]
+            metadata = hit["metadatas"][0][0]
+            now = time.time()
+            age = now - metadata.get("ts", 0)
+            
+            if similarity < self.threshold or age > self.ttl_seconds:
+                return None
+            
+            # Mark as recently used so LRU eviction keeps it
+            self.collection.update(
+                ids=[hit["ids"][0][0]],
+                metadatas=[{**metadata, "used": now}]
+            )
+            
+            logger.info(f"⚡ Semantic cache hit (similarity={similarity:.3f})")
+            return json.loads(metadata["answer"])
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return None
+    
+    def store(self, query_embedding: List[float], result: Dict) -> None:
+        """Remember a result for future similar questions."""
+        try:
+            now = time.time()
+            self.collection.add(
+                ids=[str(uuid.uuid4())],
+                embeddings=[query_embedding],
+                metadatas=[{"answer": json.dumps(result), "ts": now, "used": now}]
+            )
+            self._evict()
+        except Exception as e:
+            logger.warning(f"Semantic cache store failed: {e}")
+    
+    def _evict(self) -> None:
+        """Drop least-recently-used entries beyond max_entries."""
+        overflow = self.collection.count() - self.max_entries
+        if overflow <= 0:
+            return
+        
+        entries = self.collection.get(include=["metadatas"])
+        by_last_use = sorted(
+            zip(entries["ids"], entries["metadatas"]),
+            key=lambda entry: entry[1].get("used", entry[1].get("ts", 0))
+        )
+        self.collection.delete(ids=[entry_id for entry_id, _ in by_last_use[:overflow]])
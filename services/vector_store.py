@@ -2,20 +2,385 @@
 Vector Store - ChromaDB Management
 Learn: How to store and retrieve vector embeddings
 """
-from typing import List, Optional
+from typing import Callable, List, Optional
 from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
-from services.embeddings import get_embeddings_model
+from services.embeddings import get_embeddings_model, embed_texts
+from services.semantic_cache import CACHE_SUFFIXES
+import hashlib
+import json
 import logging
 import os
+import queue
+import re
+import threading
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Chunks per collection.add() call - large enough to amortize per-call
+# overhead, small enough to keep peak memory flat on big repos. A multiple
+# of the encode batch sizes (64 CPU / 256 GPU), so no forward pass is ragged.
+INGEST_BATCH_SIZE = 256
+
+# Concurrent add() calls when talking to a Chroma server
+SERVER_WRITE_WORKERS = 4
+
+# Batches that may wait for a writer before the embedding loop pauses
+WRITE_QUEUE_SIZE = 4
+
+# HNSW index settings for new collections. Defaults (construction_ef=100,
+# search_ef=10) trade recall for speed; at single-repo scale (<100k chunks)
+# a wider search costs little and finds noticeably better neighbours.
+HNSW_M = 16
+HNSW_CONSTRUCTION_EF = 200
+HNSW_SEARCH_EF = 64
+
+# Embeddings are L2-normalized at encode time (normalize_embeddings=True), so
+# inner product == cosine similarity; "ip" skips hnswlib's own normalization
+# of every inserted vector and of each query
+HNSW_SPACE = "ip"
+
+COLLECTION_NAME_UNSAFE_RE = re.compile(r'[^A-Za-z0-9-]+|_{2,}')
+
+# One embedded Chroma client per persist directory, shared by every
+# vector store in the process (keeps the SQLite connection and loaded
+# HNSW indexes around instead of reopening them per Chroma wrapper)
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def chroma_server_address() -> Optional[tuple]:
+    """
+    (host, port) of a Chroma server from CHROMA_HOST / CHROMA_PORT, or None.
+    
+    Start one with: chroma run --path ./chroma_db
+    """
+    host = os.getenv("CHROMA_HOST")
+    if not host:
+        return None
+    return host, int(os.getenv("CHROMA_PORT", "8000"))
+
+
+# Room left in a collection name for the "_<commit>" suffix (and for the
+# semantic caches' "_qa_cache" / "_lm_cache" suffix on top of that)
+COLLECTION_PREFIX_LEN = 40
+COMMIT_SUFFIX_LEN = 12
+
+# Bytes of the full-name hash ending every prefix, so repos whose names
+# share the truncated part still get distinct collections
+NAME_HASH_BYTES = 4
+
+
+def persistent_client(persist_directory: str):
+    """Shared chromadb.PersistentClient for persist_directory (created once)."""
+    path = os.path.abspath(persist_directory)
+    client = _CLIENTS.get(path)
+    if client is not None:
+        return client
+    
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(path)
+        if client is None:
+            import chromadb
+            
+            client = _CLIENTS[path] = chromadb.PersistentClient(path=path)
+    return client
+
+
+def collection_name_for(name: str, commit: Optional[str] = None) -> str:
+    """
+    Turn a repo name into a valid Chroma collection name (3-63 chars, alnum ends).
+    
+    The repo prefix is "repo_<name, truncated>_<hash of the full name>", so
+    two long names with the same beginning never share (or drop) each
+    other's collections. With a commit SHA the name is
+    "<repo prefix>_<sha[:12]>", so each indexed commit gets its own
+    collection and a new commit never reuses stale chunks.
+    """
+    safe = COLLECTION_NAME_UNSAFE_RE.sub('_', name)
+    name_hash = hashlib.blake2b(name.encode("utf-8"), digest_size=NAME_HASH_BYTES).hexdigest()
+    head = f"repo_{safe}"[:COLLECTION_PREFIX_LEN - len(name_hash) - 1].rstrip('_-')
+    prefix = f"{head}_{name_hash}"
+    if commit:
+        return f"{prefix}_{commit[:COMMIT_SUFFIX_LEN]}"
+    return prefix
+
+
+def drop_stale_collections(persist_directory: str, collection_name: str) -> int:
+    """
+    Delete collections indexed for other commits of the same repo.
+    
+    Those are "<repo prefix>[_<sha>][<cache suffix>]" - same prefix
+    (including its full-name hash) as collection_name, another (or no)
+    commit suffix. collection_name itself and its semantic caches are kept.
+    """
+    prefix = collection_name.rsplit('_', 1)[0]
+    cache_suffixes = "|".join(map(re.escape, CACHE_SUFFIXES))
+    stale_re = re.compile(rf"{re.escape(prefix)}(?:_[0-9a-f]{{{COMMIT_SUFFIX_LEN}}})?(?:{cache_suffixes})?")
+    client = chroma_client(persist_directory)
+    
+    dropped = 0
+    for collection in client.list_collections():
+        # chromadb >= 0.6 returns names, older versions Collection objects
+        name = getattr(collection, "name", collection)
+        if stale_re.fullmatch(name) and not name.startswith(collection_name):
+            client.delete_collection(name)
+            _clear_manifest(persist_directory, name)
+            dropped += 1
+    
+    if dropped:
+        logger.info(f"🧹 Dropped {dropped} collections from older commits")
+    return dropped
+
+
+def hnsw_metadata(
+    m: int = HNSW_M,
+    construction_ef: int = HNSW_CONSTRUCTION_EF,
+    search_ef: int = HNSW_SEARCH_EF
+) -> dict:
+    """Collection metadata Chroma forwards to its hnswlib index."""
+    return {
+        "hnsw:space": HNSW_SPACE,
+        "hnsw:M": m,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef,
+    }
+
+
+def create_vector_store(
+    embeddings,
+    persist_directory: str,
+    collection_name: str = "langchain",
+    **hnsw_params
+) -> Chroma:
+    """
+    LEARN: Embedded vs client/server Chroma
+    
+    - Embedded (default): Chroma runs inside this process, writes block it
+    - Server (CHROMA_HOST set): Chroma runs in its own process, so writes
+      don't compete with Streamlit for the GIL and can run concurrently
+    
+    Args:
+        embeddings: Embedding model used for queries
+        persist_directory: On-disk location (embedded mode only)
+        collection_name: Collection to use; must be unique per repo in server mode
+        **hnsw_params: m / construction_ef / search_ef overrides (see
+            hnsw_metadata); only applied when the collection is created
+    
+    Returns:
+        Empty or existing Chroma vector store
+    """
+    address = chroma_server_address()
+    if address:
+        host, port = address
+        logger.info(f"🌐 Using Chroma server at {host}:{port} (collection={collection_name})")
+    
+    return Chroma(
+        client=chroma_client(persist_directory),
+        embedding_function=embeddings,
+        collection_name=collection_name,
+        collection_metadata=hnsw_metadata(**hnsw_params)
+    )
+
+
+def chroma_client(persist_directory: str):
+    """Chroma server client when CHROMA_HOST is set, else the shared embedded client"""
+    address = chroma_server_address()
+    if address:
+        import chromadb
+        
+        host, port = address
+        return chromadb.HttpClient(host=host, port=port)
+    return persistent_client(persist_directory)
+
+
+def count_existing_documents(persist_directory: str, collection_name: str) -> int:
+    """
+    Number of chunks already indexed for a repo (0 if never indexed).
+    
+    For embedded Chroma, a missing chroma.sqlite3 answers the question
+    without opening a client (which would create the directory). The
+    collection is looked up, never created.
+    """
+    if not chroma_server_address():
+        sqlite_path = os.path.join(persist_directory, "chroma.sqlite3")
+        if not os.path.isfile(sqlite_path) or os.path.getsize(sqlite_path) == 0:
+            return 0
+    
+    try:
+        collection = chroma_client(persist_directory).get_collection(collection_name)
+    except Exception:
+        # Missing collection: ValueError / NotFoundError depending on chromadb version
+        return 0
+    return collection.count()
+
+
+# Subdirectory of persist_directory holding one "<collection>.json" manifest
+# per fully ingested collection
+MANIFEST_DIR = "manifests"
+
+
+def _manifest_path(persist_directory: str, collection_name: str) -> str:
+    return os.path.join(persist_directory, MANIFEST_DIR, f"{collection_name}.json")
+
+
+def mark_index_complete(persist_directory: str, collection_name: str, count: int) -> None:
+    """
+    Record that ingestion into collection_name finished with count chunks.
+    
+    Batches are written straight into the final collection, so an
+    interrupted ingest (rerun, exception) leaves a partial collection
+    behind; only collections with this marker are ever reused.
+    """
+    path = _manifest_path(persist_directory, collection_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"count": count}, f)
+    os.replace(tmp_path, path)
+
+
+def _clear_manifest(persist_directory: str, collection_name: str) -> None:
+    try:
+        os.remove(_manifest_path(persist_directory, collection_name))
+    except FileNotFoundError:
+        pass
+
+
+def completed_index_count(persist_directory: str, collection_name: str) -> int:
+    """
+    Number of chunks in a fully ingested index, else 0.
+    
+    0 means never indexed, ingestion didn't finish, or the collection no
+    longer matches its manifest - callers should discard_index and rebuild.
+    """
+    try:
+        with open(_manifest_path(persist_directory, collection_name), encoding="utf-8") as f:
+            expected = json.load(f)["count"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0
+    
+    existing = count_existing_documents(persist_directory, collection_name)
+    if existing != expected:
+        logger.warning(f"⚠️ Index {collection_name} has {existing} of {expected} chunks, rebuilding")
+        return 0
+    return existing
+
+
+def discard_index(persist_directory: str, collection_name: str) -> bool:
+    """
+    Delete a (possibly partial) collection and its manifest.
+    
+    Returns:
+        True if there was anything to delete
+    """
+    _clear_manifest(persist_directory, collection_name)
+    if not count_existing_documents(persist_directory, collection_name):
+        return False
+    chroma_client(persist_directory).delete_collection(collection_name)
+    return True
+
+
+def add_documents_in_batches(
+    vectorstore: Chroma,
+    documents: List[Document],
+    embeddings,
+    batch_size: int = INGEST_BATCH_SIZE,
+    write_workers: Optional[int] = None,
+    on_batch: Optional[Callable[[List[str], List[List[float]]], None]] = None
+) -> int:
+    """
+    LEARN: Batched ingestion instead of one giant from_documents() call
+    
+    Why batch?
+    - One huge insert = huge memory spike + slow index build
+    - Embed once per batch (batched sentence-transformers encode),
+      then write straight to the collection
+    - Writes happen on background writer thread(s), so the next batch is
+      embedded while the previous one is being persisted
+    
+    Args:
+        vectorstore: Chroma instance to write into
+        documents: Chunks from document_processor
+        embeddings: Embedding model (see embed_texts)
+        batch_size: Chunks per insert
+        write_workers: Writer threads (default: 4 with a Chroma server,
+            1 for embedded Chroma, which serializes writes anyway)
+        on_batch: Optional callback(ids, vectors) per batch, called in
+            order on the calling thread (e.g. to build an EmbeddingMatrix)
+    
+    Returns:
+        Number of documents added
+    """
+    collection = vectorstore._collection
+    batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+    if write_workers is None:
+        write_workers = SERVER_WRITE_WORKERS if chroma_server_address() else 1
+    
+    def embed_batch(batch: List[Document]) -> List[List[float]]:
+        return embed_texts(embeddings, [doc.page_content for doc in batch])
+    
+    def prepare_batch(batch: List[Document], vectors: List[List[float]]) -> List[str]:
+        ids = [str(uuid.uuid4()) for _ in batch]
+        if on_batch:
+            on_batch(ids, vectors)
+        return ids
+    
+    def write_batch(i: int, batch: List[Document], ids: List[str], vectors: List[List[float]]) -> None:
+        collection.add(
+            ids=ids,
+            embeddings=vectors,
+            metadatas=[doc.metadata for doc in batch],
+            documents=[doc.page_content for doc in batch]
+        )
+        logger.info(f"   Stored batch {i + 1}/{len(batches)} ({len(batch)} chunks)")
+    
+    # Writer threads drain a bounded queue, so the embedding loop never waits
+    # on disk/network I/O - and blocks (back-pressure) if writes fall behind
+    write_queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    write_errors: List[Exception] = []
+    
+    def writer() -> None:
+        while True:
+            item = write_queue.get()
+            if item is None:  # shutdown sentinel
+                return
+            if write_errors:
+                continue  # drain remaining batches after a failure
+            try:
+                write_batch(*item)
+            except Exception as e:
+                write_errors.append(e)
+    
+    threads = [threading.Thread(target=writer, daemon=True) for _ in range(write_workers)]
+    for thread in threads:
+        thread.start()
+    
+    try:
+        for i, batch in enumerate(batches):
+            if write_errors:
+                break
+            vectors = embed_batch(batch)
+            ids = prepare_batch(batch, vectors)
+            write_queue.put((i, batch, ids, vectors))
+    finally:
+        for _ in threads:
+            write_queue.put(None)
+        for thread in threads:
+            thread.join()
+    
+    if write_errors:
+        raise write_errors[0]
+    
+    return len(documents)
+
 
 def setup_vector_store(
     documents: List[Document],
     persist_directory: str = "./chroma_db",
-    collection_name: str = "github_rag"
+    collection_name: str = "github_rag",
+    **hnsw_params
 ) -> Chroma:
     """
     LEARN: Vector stores convert text → numbers (embeddings) → searchable database
@@ -23,12 +388,13 @@ def setup_vector_store(
     Why ChromaDB?
     - Persistent (saves to disk)
     - Fast similarity search
-    - No server needed (embedded)
+    - No server needed (embedded), optional server via CHROMA_HOST
     
     Args:
         documents: Chunks from document_processor
         persist_directory: Where to save on disk
         collection_name: Database "table" name
+        **hnsw_params: HNSW index overrides (m, construction_ef, search_ef)
     
     Returns:
         Searchable vector database
@@ -42,15 +408,11 @@ def setup_vector_store(
     
     # Step 2: Create vector store
     # This does:
-    # - For each document → create embedding (384-dim vector)
+    # - For each batch of documents → create embeddings (384-dim vectors)
     # - Store in ChromaDB
     # - Save to disk
-    vectorstore = Chroma.from_documents(
-        documents=documents,
-        embedding=embeddings,
-        persist_directory=persist_directory,
-        collection_name=collection_name
-    )
+    vectorstore = create_vector_store(embeddings, persist_directory, collection_name, **hnsw_params)
+    add_documents_in_batches(vectorstore, documents, embeddings)
     
     count = vectorstore._collection.count()
     logger.info(f"✅ Vector store ready with {count} documents")
@@ -76,7 +438,7 @@ def load_vector_store(
     embeddings = get_embeddings_model()
     
     vectorstore = Chroma(
-        persist_directory=persist_directory,
+        client=persistent_client(persist_directory),
         embedding_function=embeddings,
         collection_name=collection_name
     )
@@ -3,8 +3,16 @@ Helper utility functions for the RAG chatbot
 """
 import os
 import hashlib
+from functools import lru_cache
 from typing import List, Dict
-import streamlit as st
+
+# Real BPE token counts when tiktoken is installed, a chars/4 estimate otherwise
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+TOKEN_ENCODING = "cl100k_base"
 
 
 def create_directory(path: str) -> None:
@@ -14,8 +22,8 @@ def create_directory(path: str) -> None:
         
 
 def generate_repo_hash(repo_url: str) -> str:
-    """Generate a unique hash for a repository URL"""
-    return hashlib.md5(repo_url.encode()).hexdigest()[:8]
+    """Generate a unique hash for a repository URL (8 hex chars, BLAKE2b)"""
+    return hashlib.blake2b(repo_url.encode(), digest_size=4).hexdigest()
 
 
 def format_source_reference(source: Dict) -> str:
@@ -25,9 +33,28 @@ def format_source_reference(source: Dict) -> str:
     return f"📄 `{file_name}` (Line {line_num})"
 
 
+@lru_cache(maxsize=1)
+def _token_encoding():
+    """
+    tiktoken encoding, loaded once (the first load may download the BPE ranks).
+    
+    None if tiktoken is missing or the load failed (e.g. offline); the
+    failure is cached too, so it isn't retried on every call.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
+
+
 def count_tokens(text: str) -> int:
-    """Rough token count estimation"""
-    return len(text.split())
+    """Token count: BPE tokens via tiktoken, else ~4 characters per token"""
+    encoding = _token_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode_ordinary(text))
 
 
 def truncate_text(text: str, max_length: int = 200) -> str:
@@ -37,30 +64,36 @@ def truncate_text(text: str, max_length: int = 200) -> str:
     return text[:max_length] + "..."
 
 
-@st.cache_data
+# Supported code file extensions, as a set for O(1) membership tests
+CODE_FILE_EXTENSIONS = frozenset({
+    '.py', '.js', '.jsx', '.ts', '.tsx',
+    '.java', '.cpp', '.c', '.h', '.hpp',
+    '.go', '.rs', '.rb', '.php', '.cs',
+    '.swift', '.kt', '.scala', '.r',
+    '.md', '.txt', '.json', '.yaml', '.yml',
+    '.html', '.css', '.scss', '.sql'
+})
+
+
 def get_file_extension_filter() -> List[str]:
     """Get list of supported file extensions for code files"""
-    return [
-        '.py', '.js', '.jsx', '.ts', '.tsx',
-        '.java', '.cpp', '.c', '.h', '.hpp',
-        '.go', '.rs', '.rb', '.php', '.cs',
-        '.swift', '.kt', '.scala', '.r',
-        '.md', '.txt', '.json', '.yaml', '.yml',
-        '.html', '.css', '.scss', '.sql'
-    ]
+    return sorted(CODE_FILE_EXTENSIONS)
 
 
 def is_valid_code_file(file_path: str) -> bool:
     """Check if file is a valid code file"""
-    extensions = get_file_extension_filter()
-    return any(file_path.endswith(ext) for ext in extensions)
+    return os.path.splitext(file_path)[1].lower() in CODE_FILE_EXTENSIONS
+
+
+def filter_code_files(file_paths: List[str]) -> List[str]:
+    """Keep only valid code files (is_valid_code_file over a whole list)"""
+    splitext = os.path.splitext
+    return [path for path in file_paths if splitext(path)[1].lower() in CODE_FILE_EXTENSIONS]
 
 
 def format_chat_history(messages: List[Dict]) -> str:
     """Format chat history for context"""
-    formatted = []
-    for msg in messages:
-        role = msg.get('role', 'user')
-        content = msg.get('content', '')
-        formatted.append(f"{role.upper()}: {content}")
-    return "\n".join(formatted)
+    return "\n".join([
+        f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}"
+        for msg in messages
+    ])